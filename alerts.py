@@ -0,0 +1,160 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- 1. CONFIGURACIÓN ---
+ALERTS_DIR = os.environ.get("RTL_ALERTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".alertas"))
+MAX_DELTA_SNAPSHOTS = 12
+
+# Llave tienda + SKU por retailer y columnas descriptivas que se guardan con cada alerta
+ALERT_KEYS = {
+    "SORIANA": ["NO_TIENDA", "CODIGO"],
+    "WALMART": ["TIENDA", "CODIGO"],
+    "CHEDRAUI": ["NO_TIENDA", "DESC_KEY"],
+}
+ALERT_INFO = {
+    "SORIANA": {"TIENDA": "TIENDA", "DESCRIPCION": "DESCRIPCION"},
+    "WALMART": {"TIENDA": "TIENDA", "DESCRIPCION": "DESCRIPCION"},
+    "CHEDRAUI": {"TIENDA": "TIENDA", "DESCRIPCION": "ARTICULO"},
+}
+
+# Excepción -> (predicado, columna de severidad, dirección en la que empeora)
+# Walmart: venta en piezas de las últimas 4 semanas (columnas 73-76 del archivo, nombradas en load_wal)
+WAL_4SEM_COLS = ["PZS_SEM_1", "PZS_SEM_2", "PZS_SEM_3", "PZS_SEM_4"]
+EXCEPTIONS = {
+    "SORIANA": {
+        "INV SIN VENTA": (lambda df: df["SIN_VTA"], "INV_CAJAS", 1),
+    },
+    "WALMART": {
+        "NEGATIVOS": (lambda df: df["EXISTENCIA"] < 0, "EXISTENCIA", -1),
+        "SIN VTA 4SEM": (lambda df: (df[WAL_4SEM_COLS] == 0).all(axis=1), "EXISTENCIA", 1),
+    },
+    "CHEDRAUI": {
+        "NEGATIVO / 0": (lambda df: df["DIAS_INV"] <= 0, "DIAS_INV", -1),
+        "DIAS INV < 10": (lambda df: df["DIAS_INV"] < 10, "DIAS_INV", -1),
+    },
+}
+
+# --- 2. BANDERAS DE EXCEPCIÓN (BITSET) ---
+
+def exception_bits(retailer):
+    return {name: 1 << i for i, name in enumerate(EXCEPTIONS[retailer])}
+
+def add_exception_flags(df, retailer):
+    flags = np.zeros(len(df), dtype=np.uint8)
+    for name, bit in exception_bits(retailer).items():
+        predicate = EXCEPTIONS[retailer][name][0]
+        flags[np.asarray(predicate(df), dtype=bool)] |= bit
+    df["EXC_FLAGS"] = flags
+    return df
+
+def flag_mask(df, retailer, name):
+    if "EXC_FLAGS" not in df.columns:
+        return pd.Series(np.asarray(EXCEPTIONS[retailer][name][0](df), dtype=bool), index=df.index)
+    return pd.Series((df["EXC_FLAGS"].to_numpy() & exception_bits(retailer)[name]) != 0, index=df.index)
+
+def flag_counts(df, retailer):
+    return {name: int(flag_mask(df, retailer, name).sum()) for name in EXCEPTIONS[retailer]}
+
+# --- 3. CONJUNTO DE EXCEPCIONES ---
+
+def _info_cols(retailer):
+    return [c for c in ALERT_INFO[retailer] if c not in ALERT_KEYS[retailer]]
+
+def exception_set(df, retailer):
+    keys = ALERT_KEYS[retailer]
+    info = ALERT_INFO[retailer]
+    info_cols = _info_cols(retailer)
+    parts = []
+    for name, (_, value_col, _) in EXCEPTIONS[retailer].items():
+        mask = flag_mask(df, retailer, name).to_numpy()
+        if not mask.any():
+            continue
+        sub = pd.DataFrame({k: df.loc[mask, k].astype(str) for k in keys})
+        for c in info_cols:
+            sub[c] = df.loc[mask, info[c]].astype(str)
+        sub["VALOR"] = df.loc[mask, value_col].astype("float64")
+        sub = sub.groupby(keys, sort=False).agg(**{c: (c, "first") for c in info_cols}, VALOR=("VALOR", "sum")).reset_index()
+        sub.insert(len(keys), "EXCEPCION", name)
+        parts.append(sub)
+    cols = keys + ["EXCEPCION"] + info_cols + ["VALOR"]
+    if not parts:
+        return pd.DataFrame(columns=cols)
+    return pd.concat(parts, ignore_index=True)[cols]
+
+def snapshot_id(exc):
+    if exc.empty:
+        return "0"
+    return format(int(pd.util.hash_pandas_object(exc, index=False).sum()) & 0xFFFFFFFFFFFFFFFF, "x")
+
+# --- 4. DIFERENCIA ENTRE CORTES ---
+
+def diff_exceptions(prev, curr, retailer):
+    keys = ALERT_KEYS[retailer] + ["EXCEPCION"]
+    merged = prev.merge(curr, on=keys, how="outer", suffixes=("_ANT", "_ACT"), indicator=True)
+    direction = merged["EXCEPCION"].map({name: spec[2] for name, spec in EXCEPTIONS[retailer].items()}).fillna(1)
+    both = merged["_merge"] == "both"
+    worse = both & ((merged["VALOR_ACT"] - merged["VALOR_ANT"]) * direction > 0)
+    status = np.select(
+        [merged["_merge"] == "right_only", merged["_merge"] == "left_only", worse],
+        ["NUEVA", "RESUELTA", "EMPEORO"], default="")
+    merged["ESTADO_ALERTA"] = status
+    merged = merged[merged["ESTADO_ALERTA"] != ""]
+    info_cols = _info_cols(retailer)
+    for c in info_cols:
+        merged[c] = merged[f"{c}_ACT"].fillna(merged[f"{c}_ANT"])
+    return merged[keys + ["ESTADO_ALERTA"] + info_cols + ["VALOR_ANT", "VALOR_ACT"]].reset_index(drop=True)
+
+# --- 5. PERSISTENCIA ---
+
+def _path(retailer, kind):
+    return os.path.join(ALERTS_DIR, f"{retailer}_{kind}.parquet")
+
+def _write(df, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def _read(path):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+def store_counts(exc, retailer):
+    counts = exc.groupby(["TIENDA", "EXCEPCION"]).size().unstack(fill_value=0)
+    counts = counts.reindex(columns=list(EXCEPTIONS[retailer]), fill_value=0).astype("int32")
+    return counts.reset_index()
+
+def update_alerts(df, retailer):
+    curr = exception_set(df, retailer)
+    curr_id = snapshot_id(curr)
+    prev = _read(_path(retailer, "actual"))
+    prev_id = None if prev is None else (prev["SNAPSHOT_ID"].iloc[0] if not prev.empty else "0")
+    if prev_id == curr_id:
+        return None
+    os.makedirs(ALERTS_DIR, exist_ok=True)
+
+    deltas = None
+    if prev is not None:
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        deltas = diff_exceptions(prev.drop(columns=["SNAPSHOT_ID"]), curr, retailer)
+        deltas.insert(0, "CORTE", stamp)
+        history = _read(_path(retailer, "deltas"))
+        if history is not None:
+            cortes = history["CORTE"].drop_duplicates().tolist()[-(MAX_DELTA_SNAPSHOTS - 1):]
+            history = pd.concat([history[history["CORTE"].isin(cortes)], deltas], ignore_index=True)
+        _write(deltas if history is None else history, _path(retailer, "deltas"))
+
+    _write(curr.assign(SNAPSHOT_ID=curr_id), _path(retailer, "actual"))
+    return deltas
+
+def load_deltas(retailer):
+    deltas = _read(_path(retailer, "deltas"))
+    if deltas is None or deltas.empty:
+        return None, None
+    last = deltas["CORTE"].iloc[-1]
+    return deltas[deltas["CORTE"] == last].reset_index(drop=True), last
+
+def alerts_version(retailer, kind="deltas"):
+    path = _path(retailer, kind)
+    return os.path.getmtime(path) if os.path.exists(path) else 0
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from ingest import MONEY_SCALE
+from kpis import FILTER_COLS, DESC_COL, DIAS_INV_IGNORES_ARTICLE, RANKING_MODES, SALES_COL
+from kpis import apply_filters, base_frame, total_sell_out, dias_inv_kpis, category_sales, sales_ranking
+from loaders import LOADERS, load_retailer
+
+# --- 1. CONFIGURACIÓN ---
+API_PREFIX = "/api/v1"
+RESPONSE_TTL = 300
+MAX_RESPONSES = 512
+
+# --- 2. CACHÉ DE RESPUESTAS ---
+
+class ResponseCache:
+    # LRU de cuerpos JSON ya serializados. Cada entrada guarda una referencia débil al dataset
+    # con el que se calculó: si el dataset se recarga (TTL, otra versión del almacén compartido)
+    # la identidad cambia y la entrada deja de ser válida sin tener que invalidarla a mano.
+
+    def __init__(self, max_entries=MAX_RESPONSES, ttl=RESPONSE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, dataset):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["ref"]() is dataset and time.time() - entry["created"] <= self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry["body"], entry["etag"]
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, dataset, body):
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self.lock:
+            self.entries[key] = {"ref": weakref.ref(dataset), "created": time.time(), "body": body, "etag": etag}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return body, etag
+
+    def stats(self):
+        with self.lock:
+            return {"entradas": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+# --- 3. CONSULTAS ---
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def money(pesos):
+    cents = int(round(float(pesos) * MONEY_SCALE))
+    return {"pesos": cents / MONEY_SCALE, "centavos": cents}
+
+def parse_filters(retailer, query):
+    unknown = sorted(set(query) - set(FILTER_COLS[retailer]) - {"limit"})
+    if unknown:
+        raise ApiError(400, f"Filtros no válidos para {retailer}: {', '.join(unknown)}")
+    return {col: sorted(query[col]) for col in FILTER_COLS[retailer] if col in query}
+
+def filtered(df, filters):
+    return apply_filters(df, list(filters), list(filters.values()))
+
+def kpis_payload(df, retailer, filters):
+    dff = filtered(df, filters)
+    # Igual que en la app: las tarjetas DIAS INV de Walmart y Chedraui no aplican el filtro de artículo
+    desc_col = DESC_COL[retailer]
+    kpi_filters = {c: v for c, v in filters.items() if c != desc_col} if DIAS_INV_IGNORES_ARTICLE[retailer] else filters
+    col = SALES_COL[retailer]
+    pie = category_sales(dff, retailer)
+    return {
+        "retailer": retailer,
+        "filtros": filters,
+        "renglones": len(dff),
+        "sell_out": money(total_sell_out(dff, retailer)),
+        "dias_inv": {k: round(float(v), 1) for k, v in dias_inv_kpis(filtered(df, kpi_filters), retailer).items()},
+        "categorias": [{"categoria": rec["Category"], "sell_out": money(rec[col]), "porcentaje": round(float(rec["Percent"]), 2)}
+                       for rec in pie.to_dict("records")],
+    }
+
+def ranking_payload(df, retailer, mode, filters, limit):
+    rank = sales_ranking(filtered(df, filters), retailer, mode)
+    rows = []
+    if rank is not None:
+        title = rank.columns[-1]
+        for rec in (rank.head(limit) if limit else rank).to_dict("records"):
+            row = {"no_tienda": str(rec["No Tienda"])} if "No Tienda" in rec else {}
+            rows.append({**row, "tienda": str(rec["TIENDA"]), "venta": money(rec[title])})
+    return {"retailer": retailer, "modo": mode, "titulo": rank.columns[-1] if rank is not None else None,
+            "filtros": filters, "tiendas": rows}
+
+def route(path, query):
+    parts = [p for p in path[len(API_PREFIX):].split("/") if p]
+    if not parts:
+        raise ApiError(404, "Ruta no encontrada")
+    if parts == ["retailers"]:
+        return None, lambda df: {r: {"filtros": FILTER_COLS[r], "rankings": RANKING_MODES} for r in LOADERS}
+    retailer = parts[0].upper()
+    if retailer not in LOADERS:
+        raise ApiError(404, f"Retailer desconocido: {parts[0]}")
+    filters = parse_filters(retailer, query)
+    if parts[1:] == ["kpis"]:
+        return retailer, lambda df: kpis_payload(df, retailer, filters)
+    if len(parts) == 3 and parts[1] == "ranking" and parts[2].upper() in RANKING_MODES:
+        try:
+            limit = int(query.get("limit", ["0"])[0])
+        except ValueError:
+            raise ApiError(400, "limit debe ser entero")
+        return retailer, lambda df: ranking_payload(df, retailer, parts[2].upper(), filters, limit)
+    raise ApiError(404, "Ruta no encontrada")
+
+# --- 4. SERVIDOR HTTP ---
+
+class ApiHandler(BaseHTTPRequestHandler):
+    cache = ResponseCache()
+    # Sin dataset (listado de retailers) la entrada se liga a este objeto, que nunca cambia
+    static = type("Static", (), {})()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            return self.send_json(200, json.dumps({"status": "ok", "cache": self.cache.stats()}).encode())
+        if not url.path.startswith(API_PREFIX + "/"):
+            return self.send_json(404, self.error_body("Ruta no encontrada"))
+        query = parse_qs(url.query)
+        try:
+            retailer, build = route(url.path, query)
+            dataset = load_retailer(retailer) if retailer else self.static
+            if dataset is None:
+                raise ApiError(503, f"Datos de {retailer} no disponibles")
+            key = (url.path.lower(), tuple(sorted((k, tuple(sorted(v))) for k, v in query.items())))
+            cached = self.cache.get(key, dataset)
+            status = "HIT" if cached else "MISS"
+            if cached is None:
+                df = base_frame(dataset, retailer) if retailer else None
+                body = json.dumps(build(df), ensure_ascii=False, default=str).encode()
+                cached = self.cache.put(key, dataset, body)
+        except ApiError as e:
+            return self.send_json(e.status, self.error_body(str(e)))
+        body, etag = cached
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_json(200, body, etag, status)
+
+    def error_body(self, message):
+        return json.dumps({"error": message}, ensure_ascii=False).encode()
+
+    def send_json(self, status, body, etag=None, cache_status=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        # Los datos cambian con cada recarga: el cliente revalida siempre y recibe 304 si no hubo cambio
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        if cache_status:
+            self.send_header("X-Cache", cache_status)
+        self.end_headers()
+        self.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de solo lectura con KPIs y rankings de Retail Manager.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--ttl", type=float, default=RESPONSE_TTL, help="Segundos que vive una respuesta en caché")
+    parser.add_argument("--max-entries", type=int, default=MAX_RESPONSES)
+    args = parser.parse_args()
+
+    ApiHandler.cache = ResponseCache(args.max_entries, args.ttl)
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"API en http://{args.host}:{args.port}{API_PREFIX}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
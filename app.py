@@ -4,7 +4,12 @@ import time
 import urllib.parse 
 import requests 
 import altair as alt 
-from io import BytesIO 
+from ingest import consolidated_kpis, text_key, from_cents
+from loaders import URLS_DB, ONLINE_CHECK_URL, load_sor, load_wal, load_che, load_fre, get_dataset_cache, get_shared_store
+from search_index import SearchIndex
+from kpis import apply_filters, base_frame, total_sell_out, dias_inv_kpis, category_sales, sales_ranking, cached_summary, cached_fact_table, dataset_token, RANKING_MODES, DEFAULT_FILTERS, SALES_COL, cached_store_counts
+from replenishment import project_inventory, reorder_list, reorder_summary, export_csv, REORDER_SOURCES, DEFAULT_TARGET_DAYS, MAX_TARGET_DAYS
+from alerts import load_deltas, alerts_version, flag_mask, flag_counts
 
 # --- 1. CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -16,12 +21,23 @@ st.set_page_config(
 
 # --- 2. CONFIGURACIÓN CENTRALIZADA ---
 CACHE_CONFIG = {'ttl': 3600, 'max_entries': 10, 'show_spinner': False}
+# CSV del sugerido: puede ser de todo el país, se guardan pocos
+EXPORT_CACHE_CONFIG = {**CACHE_CONFIG, 'max_entries': 2}
+# Búsqueda en servidor para listas largas: a partir de cuántas opciones y cuántas coincidencias mostrar
+SEARCH_CONFIG = {'min_options': 50, 'limit': 50}
+
+# Vista ligera para celular: ?lite=1 / ?lite=0 la fuerza; sin parámetro se decide por el User-Agent
+LITE_CONFIG = {'param': 'lite', 'ua_hints': ('Mobi', 'Android', 'iPhone'), 'top_n': 10}
+DIAS_INV_COLORS = {
+    "NUTRIOLI 850ML": "#28a745", "NUTRIOLI 946M": "#28a745", "SABROSANO 850ML": "#E4007C",
+    "PASTAS": "#64DD17", "AVE 850ML": "#D32F2F", "GRAN TRADICION": "#8B4513"
+}
 
-# URLs de Datos
-URLS_DB = {
-    "SORIANA": "https://github.com/gamerhackleon-afk/RTLRAGA/raw/main/SORIANA.xlsx",
-    "WALMART": "https://github.com/gamerhackleon-afk/RTLRAGA/raw/main/WALMART.xlsx",
-    "CHEDRAUI": "https://github.com/gamerhackleon-afk/RTLRAGA/raw/main/CHEDRAUI.xlsx"
+# Llave de estado de cada modo de ranking por retailer
+RANK_STATE = {
+    "SORIANA": {"GENERAL": "s_rank_gen", "PASTAS": "s_rank_pas", "OLIVAS": "s_rank_oli", "NUTRIOLI": "s_rank_nut"},
+    "WALMART": {"GENERAL": "w_rank_tiendas", "PASTAS": "w_rank_pastas", "OLIVAS": "w_rank_olivas", "NUTRIOLI": "w_nutri_top10"},
+    "CHEDRAUI": {"GENERAL": "c_rank_gen", "PASTAS": "c_rank_pas", "OLIVAS": "c_rank_oli", "NUTRIOLI": "c_rank_nut"},
 }
 
 # Colores por retailer
@@ -29,13 +45,14 @@ RETAILER_COLORS = {
     "SORIANA": "#D32F2F",
     "WALMART": "#0071DC", 
     "CHEDRAUI": "#FF6600",
-    "FRESKO": "#CCFF00"
+    "FRESKO": "#CCFF00",
+    "CONSOLIDADO": "#37474F"
 }
 
 # Inicialización de estado
 if 'is_online' not in st.session_state:
     try:
-        requests.get("https://github.com", timeout=2)
+        requests.get(ONLINE_CHECK_URL, timeout=2)
         st.session_state.is_online = True
     except:
         st.session_state.is_online = False
@@ -46,23 +63,28 @@ if 'active_retailer' not in st.session_state:
 if 'confirm_reset' not in st.session_state:
     st.session_state.confirm_reset = False
 
-# --- 3. FUNCIONES UTILITARIAS Y DE CONTROL ---
-
-def safe_mean(series):
-    return series.mean() if not series.empty else 0
+lite_param = st.query_params.get(LITE_CONFIG['param'])
+if lite_param is not None:
+    st.session_state.lite = lite_param == "1"
+elif 'lite' not in st.session_state:
+    st.session_state.lite = any(h in st.context.headers.get("User-Agent", "") for h in LITE_CONFIG['ua_hints'])
 
-def apply_filters(df, filter_cols, selections):
-    mask = pd.Series(True, index=df.index)
-    for col, sel in zip(filter_cols, selections):
-        if sel:
-            mask &= df[col].astype(str).isin(sel)
-    return df[mask]
+# --- 3. FUNCIONES UTILITARIAS Y DE CONTROL ---
 
-def get_kpi_mean(df, desc_col, days_col, pattern):
-    clean_desc = df[desc_col].astype(str).str.upper().str.replace("&NBSP;", "", regex=False).str.replace(" ", "", regex=False)
-    clean_pattern = pattern.upper().replace("&NBSP;", "").replace(" ", "")
-    mask = clean_desc.str.contains(clean_pattern, case=False, na=False)
-    return safe_mean(df.loc[mask, days_col])
+@st.cache_resource(**CACHE_CONFIG)
+def get_search_index(options):
+    return SearchIndex(options)
+
+def search_select(label, options, key):
+    if len(options) < SEARCH_CONFIG['min_options']:
+        return st.multiselect(label, options, key=key)
+    valid = set(options)
+    selected = [o for o in st.session_state.get(key, []) if o in valid]
+    if key in st.session_state and len(selected) != len(st.session_state[key]): st.session_state[key] = selected
+    query = st.text_input(label, key=f"{key}_q", placeholder=f"🔎 Buscar entre {len(options):,}...")
+    matches = get_search_index(tuple(options)).search(query, SEARCH_CONFIG['limit']) if query.strip() else options[:SEARCH_CONFIG['limit']]
+    return st.multiselect(label, list(dict.fromkeys(selected + matches)), key=key, label_visibility="collapsed",
+                          placeholder=f"{len(matches):,} coincidencias" if query.strip() else "Escribe arriba para buscar")
 
 def whatsapp_report(title, data, max_rows=40):
     msg = [f"*{title} ({len(data)})*"]
@@ -79,17 +101,6 @@ def whatsapp_report(title, data, max_rows=40):
     url = f"https://wa.me/?text={urllib.parse.quote(chr(10).join(msg))}"
     st.markdown(f'<a href="{url}" target="_blank" style="text-decoration:none;"><div style="background-color:#25D366;color:white;padding:12px;text-align:center;font-weight:bold;border-radius:8px;margin:10px 0;">📱 ENVIAR REPORTE WHATSAPP</div></a>', unsafe_allow_html=True)
 
-def download_file(url_or_file):
-    if isinstance(url_or_file, str):
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url_or_file, headers=headers, timeout=10)
-            response.raise_for_status()
-            return BytesIO(response.content)
-        except Exception:
-            return None
-    return url_or_file
-
 def get_data(key, uploader_key, load_func):
     df = None
     if st.session_state.is_online and key in URLS_DB:
@@ -105,127 +116,83 @@ def get_data(key, uploader_key, load_func):
         if f: df = load_func(f)
     return df
 
+@st.cache_data(**CACHE_CONFIG)
+def get_alert_deltas(retailer, version):
+    return load_deltas(retailer)
+
+def badge(label, counts, name):
+    return f"{label} ({counts[name]:,})" if counts.get(name) else label
+
+@st.fragment
+def alerts_panel(retailer, dff, counts):
+    deltas, corte = get_alert_deltas(retailer, alerts_version(retailer))
+    if deltas is None and counts.empty: return
+    stores = dff["TIENDA"].astype(str).unique()
+    with st.expander(f"🔔 Alertas desde el corte anterior ({corte or 'sin corte previo'})", expanded=False):
+        if not counts.empty:
+            counts = counts[counts["TIENDA"].isin(stores)]
+            counts = counts.assign(TOTAL=counts.drop(columns="TIENDA").sum(axis=1)).sort_values(by="TOTAL", ascending=False)
+            st.caption("Excepciones por tienda")
+            st.dataframe(counts.head(20), use_container_width=True, hide_index=True)
+        if deltas is None: return
+        deltas = deltas[deltas["TIENDA"].isin(stores)]
+        if deltas.empty:
+            st.info("Sin cambios en excepciones para los filtros seleccionados.")
+            return
+        resumen = deltas.pivot_table(index="EXCEPCION", columns="ESTADO_ALERTA", values="TIENDA", aggfunc="count", fill_value=0)
+        resumen = resumen.reindex(columns=["NUEVA", "EMPEORO", "RESUELTA"], fill_value=0).reset_index()
+        st.dataframe(resumen, use_container_width=True, hide_index=True)
+        sel_estado = st.multiselect("Tipo de cambio", ["NUEVA", "EMPEORO", "RESUELTA"], default=["NUEVA", "EMPEORO"], key=f"alert_sel_{retailer}")
+        disp = deltas[deltas["ESTADO_ALERTA"].isin(sel_estado)] if sel_estado else deltas
+        disp = disp[["ESTADO_ALERTA", "EXCEPCION", "TIENDA", "DESCRIPCION", "VALOR_ANT", "VALOR_ACT"]]
+        disp.columns = ['CAMBIO', 'EXCEPCION', 'TIENDA', 'ARTICULO', 'ANTES', 'AHORA']
+        st.dataframe(disp.style.format({'ANTES': "{:,.1f}", 'AHORA': "{:,.1f}"}, na_rep="-"), use_container_width=True, hide_index=True)
+
+@st.cache_data(**EXPORT_CACHE_CONFIG)
+def get_reorder_csv(retailer, data_key, target, only_sug, day, _disp):
+    # La llave es dataset + filtros + objetivo; el DataFrame (_disp) no se hashea en cada rerun
+    return export_csv(_disp)
+
+def reorder_panel(retailer, dff, data_key, max_rows=5000):
+    st.subheader("🛒 Sugerido de Resurtido")
+    unit = REORDER_SOURCES[retailer]["unit"]
+    c1, c2 = st.columns([1, 1])
+    with c1: target = st.number_input("Días de cobertura objetivo", min_value=1, max_value=MAX_TARGET_DAYS, value=DEFAULT_TARGET_DAYS, step=1, key=f"reorder_days_{retailer}")
+    with c2: only_sug = st.toggle("Solo renglones con sugerido o agotados", value=True, key=f"reorder_only_{retailer}")
+
+    proj = project_inventory(dff, retailer, target)
+    summ = reorder_summary(proj, target)
+    k1, k2, k3, k4 = st.columns(4)
+    k1.markdown(f"<div class='kpi-card'><div class='kpi-title'>SUGERIDO ({unit})</div><div class='kpi-value' style='color:#0071DC;'>{summ['unidades']:,}</div></div>", unsafe_allow_html=True)
+    k2.markdown(f"<div class='kpi-card'><div class='kpi-title'>TIENDAS A SURTIR</div><div class='kpi-value' style='color:#28a745;'>{summ['tiendas']:,}</div></div>", unsafe_allow_html=True)
+    k3.markdown(f"<div class='kpi-card'><div class='kpi-title'>AGOTADOS</div><div class='kpi-value' style='color:#D32F2F;'>{summ['agotados']:,}</div></div>", unsafe_allow_html=True)
+    k4.markdown(f"<div class='kpi-card'><div class='kpi-title'>SE AGOTAN &lt; {target} DÍAS</div><div class='kpi-value' style='color:#FF6600;'>{summ['en_riesgo']:,}</div></div>", unsafe_allow_html=True)
+
+    disp = reorder_list(proj, only_sug)
+    st.download_button(f"⬇️ EXPORTAR SUGERIDO ({len(disp):,} renglones)", get_reorder_csv(retailer, data_key, target, only_sug, str(pd.Timestamp("today").date()), disp), file_name=f"SUGERIDO_{retailer}_{target}D.csv", mime="text/csv", use_container_width=True, key=f"reorder_csv_{retailer}")
+    if len(disp) > max_rows: st.caption(f"Mostrando los {max_rows:,} renglones más urgentes de {len(disp):,}; la exportación incluye todos.")
+    st.dataframe(disp.head(max_rows).style.format({'INVENTARIO': "{:,.0f}", 'TRANSITO': "{:,.0f}", 'VTA_DIARIA': "{:,.2f}", 'DIAS_COBERTURA': "{:,.1f}", 'FECHA_AGOTAMIENTO': lambda d: d.strftime('%d/%m/%Y') if pd.notna(d) else '-', 'SUGERIDO': "{:,}"}, na_rep="-"), use_container_width=True, hide_index=True)
+
+def toggle_lite():
+    st.session_state.lite = not st.session_state.lite
+    st.query_params[LITE_CONFIG['param']] = "1" if st.session_state.lite else "0"
+
 def set_retailer(retailer_name):
     st.session_state.active_retailer = retailer_name
     logic_vars = [
-        's_rojo', 's_dias_inv', 's_dias_prod', 's_rank_gen', 's_rank_pas', 's_rank_oli', 's_rank_nut',
-        'w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod', 'w_rank_tiendas', 'w_rank_pastas', 'w_rank_olivas', 'w_nutri_top10', 
-        'c_alt', 'c_neg', 'c_dias_inv', 'c_neg_zero', 'c_under_10', 'c_rank_gen', 'c_rank_pas', 'c_rank_oli', 'c_rank_nut'
+        's_rojo', 's_dias_inv', 's_dias_prod', 's_sug', 's_rank_gen', 's_rank_pas', 's_rank_oli', 's_rank_nut',
+        'w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod', 'w_sug', 'w_rank_tiendas', 'w_rank_pastas', 'w_rank_olivas', 'w_nutri_top10', 
+        'c_alt', 'c_neg', 'c_dias_inv', 'c_neg_zero', 'c_under_10', 'c_sug', 'c_rank_gen', 'c_rank_pas', 'c_rank_oli', 'c_rank_nut'
     ]
     for var in logic_vars:
         if var in st.session_state: st.session_state[var] = False
 
-# --- 4. FUNCIONES DE LECTURA DE EXCEL ---
-def optimize_floats(df):
-    for col in df.select_dtypes(include=['float64']).columns:
-        df[col] = df[col].astype('float32')
-    return df
-
-@st.cache_data(**CACHE_CONFIG)
-def load_sor(path):
-    try:
-        source = download_file(path)
-        if source is None: return None
-        
-        df = pd.read_excel(source, engine='openpyxl')
-        
-        while df.shape[1] < 31:
-            df[f"COL_AUTO_{df.shape[1]}"] = 0
-            
-        df.rename(columns={
-            df.columns[2]: "CODIGO", df.columns[3]: "DESCRIPCION", df.columns[4]: "CATEGORIA",
-            df.columns[5]: "NO_TIENDA", df.columns[6]: "TIENDA", df.columns[7]: "CIUDAD",
-            df.columns[8]: "ESTADO", df.columns[9]: "FORMATO", 
-            df.columns[30]: "DIAS_INV",  
-            df.columns[28]: "INV_CAJAS", 
-            df.columns[24]: "SO_$",      
-            df.columns[0]: "RESURTIMIENTO"
-        }, inplace=True)
-        
-        df["CODIGO"] = df["CODIGO"].astype(str).str.replace(r'\.0*$', '', regex=True)
-        
-        cols_num = ["DIAS_INV", "INV_CAJAS", "SO_$"]
-        for c in cols_num:
-            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
-        
-        cols_4sem = [df.columns[21], df.columns[22], df.columns[23], df.columns[24]]
-        for c in cols_4sem:
-            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
-        
-        df['SO_4SEM'] = df[cols_4sem].sum(axis=1) 
-        df['SIN_VTA'] = (df['SO_4SEM'] == 0)
-        df['VTA_PROM'] = df['SO_4SEM'] 
-        return optimize_floats(df)
-    except Exception as e: 
-        return None
-
-@st.cache_data(**CACHE_CONFIG)
-def load_wal(path):
-    try:
-        source = download_file(path)
-        if source is None: return None
-
-        df = pd.read_excel(source, engine='openpyxl')
-        
-        while df.shape[1] < 97:
-            df[f"COL_AUTO_{df.shape[1]}"] = 0
-            
-        df.rename(columns={
-            df.columns[0]: "CODIGO", df.columns[4]: "DESCRIPCION", df.columns[5]: "CATEGORIA",
-            df.columns[7]: "ESTADO", df.columns[15]: "TIENDA", df.columns[16]: "FORMATO",
-            df.columns[18]: "MARCA",
-            df.columns[33]: "DIAS_INV", df.columns[42]: "EXISTENCIA"
-        }, inplace=True)
-        df["CODIGO"] = df["CODIGO"].astype(str).str.replace(r'\.0*$', '', regex=True)
-        for col_idx in [33, 42, 73, 74, 75, 76, 96]:
-            c_name = df.columns[col_idx]
-            df[c_name] = pd.to_numeric(df[c_name], errors='coerce').fillna(0)
-        df['PROM_PZS_MENSUAL'] = df.iloc[:,[73,74,75,76]].mean(axis=1)
-        df['SO_$'] = df.iloc[:,96]
-        return optimize_floats(df)
-    except Exception as e: 
-        return None
-
-@st.cache_data(**CACHE_CONFIG)
-def load_che(path):
-    try:
-        source = download_file(path)
-        if source is None: return None
-
-        df = pd.read_excel(source, engine='openpyxl')
-        
-        while df.shape[1] < 20:
-            df[f"COL_AUTO_{df.shape[1]}"] = 0
-            
-        col_h = pd.to_numeric(df.iloc[:, 7], errors='coerce')
-        df = df[col_h != 0]
-            
-        df = df.dropna(subset=[df.columns[12]])
-        df = df[pd.to_numeric(df.iloc[:,9], errors='coerce').notna()]
-        
-        df.rename(columns={
-            df.columns[3]: "ESTADO", df.columns[8]: "CATEGORIA", df.columns[9]: "NO_TIENDA",
-            df.columns[10]: "TIENDA", df.columns[12]: "ARTICULO", df.columns[13]: "INV_ULT_SEM",
-            df.columns[17]: "VTA_PROM_DIARIA", df.columns[18]: "DIAS_INV", df.columns[19]: "SELL_OUT"
-        }, inplace=True)
-
-        for col in ["INV_ULT_SEM", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-        return optimize_floats(df)
-    except Exception as e: 
-        return None
-
-@st.cache_data(**CACHE_CONFIG)
-def load_fre(file):
-    return pd.read_excel(file, engine='openpyxl')
-
-# --- 5. CSS AVANZADO RESPONSIVO ---
+# --- 4. CSS AVANZADO RESPONSIVO ---
 act = st.session_state.active_retailer
 style_on = "opacity: 1 !important; border: 3px solid #ffffff !important; transform: scale(1.02) !important; box-shadow: 0 8px 16px rgba(0,0,0,0.3) !important; z-index: 10 !important;"
 style_off = "opacity: 0.6 !important; transform: scale(0.98) !important; filter: grayscale(40%) !important; border: 1px solid transparent !important;"
 
-css_styles = {k: style_on if act == k else style_off for k in ['SORIANA', 'WALMART', 'CHEDRAUI', 'FRESKO']}
+css_styles = {k: style_on if act == k else style_off for k in ['SORIANA', 'WALMART', 'CHEDRAUI', 'FRESKO', 'CONSOLIDADO']}
 
 st.markdown(f"""
 <style>
@@ -263,7 +230,7 @@ div[data-testid="stHorizontalBlock"]:nth-of-type(3) [data-testid="stColumn"]:nth
 </style>
 """, unsafe_allow_html=True)
 
-# --- 6. HEADER ---
+# --- 5. HEADER ---
 c_head1, c_head2 = st.columns([1, 5])
 with c_head1:
     try: st.image("ragasa_logo.png", use_container_width=True)
@@ -280,7 +247,7 @@ status_txt = 'CONECTADO' if st.session_state.is_online else 'OFFLINE'
 status_color = "#28a745" if st.session_state.is_online else "#dc3545"
 st.markdown(f"<div style='text-align:right; font-size:0.7rem; color:{status_color}; font-weight:bold; margin-bottom:5px;'>● {status_txt}</div>", unsafe_allow_html=True)
 
-# --- 7. NAVEGACIÓN ---
+# --- 6. NAVEGACIÓN ---
 col1, col2 = st.columns(2, gap="small")
 with col1: st.button("SORIANA", on_click=set_retailer, args=("SORIANA",), use_container_width=True, key="nav_sor")
 with col2: st.button("WALMART", on_click=set_retailer, args=("WALMART",), use_container_width=True, key="nav_wal")
@@ -288,15 +255,17 @@ with col2: st.button("WALMART", on_click=set_retailer, args=("WALMART",), use_co
 col3, col4 = st.columns(2, gap="small")
 with col3: st.button("CHEDRAUI", on_click=set_retailer, args=("CHEDRAUI",), use_container_width=True, key="nav_che")
 with col4: st.button("FRESKO", on_click=set_retailer, args=("FRESKO",), use_container_width=True, key="nav_fre")
+st.button("🌐 CONSOLIDADO", on_click=set_retailer, args=("CONSOLIDADO",), use_container_width=True, key="nav_con")
 
 st.markdown("<hr style='margin: 15px 0; border: 0; border-top: 1px solid #eee;'>", unsafe_allow_html=True)
+st.button("🖥️ VISTA COMPLETA" if st.session_state.lite else "📱 VISTA LIGERA", on_click=toggle_lite, key="btn_lite")
 
-# --- 8. VISTAS POR RETAILER ---
+# --- 7. VISTAS POR RETAILER ---
 
 def view_soriana(df_s):
     st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['SORIANA']}'>SORIANA</div>", unsafe_allow_html=True)
     
-    s_vars = ['s_rojo', 's_dias_inv', 's_dias_prod', 's_rank_gen', 's_rank_pas', 's_rank_oli', 's_rank_nut']
+    s_vars = ['s_rojo', 's_dias_inv', 's_dias_prod', 's_sug', 's_rank_gen', 's_rank_pas', 's_rank_oli', 's_rank_nut']
     for v in s_vars:
         if v not in st.session_state: st.session_state[v] = False
     
@@ -304,14 +273,22 @@ def view_soriana(df_s):
         st.session_state.s_rojo = not st.session_state.s_rojo
         st.session_state.s_dias_inv = False
         st.session_state.s_dias_prod = False
+        st.session_state.s_sug = False
     def tog_s_dias_inv():
         st.session_state.s_dias_inv = not st.session_state.s_dias_inv
         st.session_state.s_rojo = False
         st.session_state.s_dias_prod = False
+        st.session_state.s_sug = False
     def tog_s_dias_prod():
         st.session_state.s_dias_prod = not st.session_state.s_dias_prod
         st.session_state.s_rojo = False
         st.session_state.s_dias_inv = False
+        st.session_state.s_sug = False
+    def tog_s_sug():
+        st.session_state.s_sug = not st.session_state.s_sug
+        st.session_state.s_rojo = False
+        st.session_state.s_dias_inv = False
+        st.session_state.s_dias_prod = False
 
     def set_s_rank(mode):
         for v in ['s_rank_gen', 's_rank_pas', 's_rank_oli', 's_rank_nut']: st.session_state[v] = False
@@ -325,217 +302,180 @@ def view_soriana(df_s):
             c1, c2 = st.columns(2)
             with c1:
                 opts_res = ["Todos"] + sorted(df_s["RESURTIMIENTO"].astype(str).unique())
-                def_res = ["1.0"] if "1.0" in opts_res else ["Todos"]
+                def_res = [v for v in DEFAULT_FILTERS["SORIANA"]["RESURTIMIENTO"] if v in opts_res] or ["Todos"]
                 fil_res = st.multiselect("Resurtible", opts_res, default=def_res)
                 
                 fil_nda = st.multiselect("No Tienda", sorted(df_s["NO_TIENDA"].astype(str).unique()))
-                fil_nom = st.multiselect("Nombre", sorted(df_s["TIENDA"].astype(str).unique()))
+                fil_nom = search_select("Nombre", sorted(df_s["TIENDA"].astype(str).unique()), key="s_fil_nom")
                 fil_cat = st.multiselect("Categoría", sorted(df_s["CATEGORIA"].astype(str).unique()))
             with c2:
                 fil_cd = st.multiselect("Ciudad", sorted(df_s["CIUDAD"].astype(str).unique()))
                 fil_edo = st.multiselect("Estado", sorted(df_s["ESTADO"].astype(str).unique()))
                 fil_fmt = st.multiselect("Formato", sorted(df_s["FORMATO"].astype(str).unique()))
-                fil_art = st.multiselect("Artículo", sorted(df_s["DESCRIPCION"].astype(str).unique()))
+                fil_art = search_select("Artículo", sorted(df_s["DESCRIPCION"].astype(str).unique()), key="s_fil_art")
 
         dff = apply_filters(df_s, 
             ["RESURTIMIENTO", "NO_TIENDA", "TIENDA", "CATEGORIA", "CIUDAD", "ESTADO", "FORMATO", "DESCRIPCION"], 
             [fil_res if "Todos" not in fil_res else None, fil_nda, fil_nom, fil_cat, fil_cd, fil_edo, fil_fmt, fil_art]
         )
-
-        b1, b2, b3 = st.columns(3, gap="small")
-        with b1: st.button("🔴 INV SIN VENTA", on_click=tog_s_rojo, use_container_width=True, type="primary", key="btn_sor_rojo")
-        with b2: 
-            st.markdown(f'<div class="{"rank-green-on" if st.session_state.s_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
-            st.button("📅 DIAS INV", on_click=tog_s_dias_inv, use_container_width=True, key="btn_sor_dias")
-            st.markdown('</div>', unsafe_allow_html=True)
-        with b3:
-            st.markdown(f'<div class="{"rank-green-on" if st.session_state.s_dias_prod else "dias-inv-style"}">', unsafe_allow_html=True)
-            st.button("📋 DIAS X PROD", on_click=tog_s_dias_prod, use_container_width=True, key="btn_sor_prod")
+        reorder_key = (dataset_token(df_s), fil_res, fil_nda, fil_nom, fil_cat, fil_cd, fil_edo, fil_fmt, fil_art)
+        alerts_panel("SORIANA", dff, cached_store_counts(df_s, "SORIANA"))
+
+        @st.fragment
+        def panel_vista(dff):
+            exc_counts = flag_counts(dff, "SORIANA")
+            b1, b2, b3 = st.columns(3, gap="small")
+            with b1: st.button(badge("🔴 INV SIN VENTA", exc_counts, "INV SIN VENTA"), on_click=tog_s_rojo, use_container_width=True, type="primary", key="btn_sor_rojo")
+            with b2: 
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.s_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("📅 DIAS INV", on_click=tog_s_dias_inv, use_container_width=True, key="btn_sor_dias")
+                st.markdown('</div>', unsafe_allow_html=True)
+            with b3:
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.s_dias_prod else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("📋 DIAS X PROD", on_click=tog_s_dias_prod, use_container_width=True, key="btn_sor_prod")
+                st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="{"rank-green-on" if st.session_state.s_sug else "dias-inv-style"}">', unsafe_allow_html=True)
+            st.button("🛒 SUGERIDO", on_click=tog_s_sug, use_container_width=True, key="btn_sor_sug")
             st.markdown('</div>', unsafe_allow_html=True)
 
-        if st.session_state.s_dias_prod:
-            st.subheader("📋 Días Inventario x Producto")
-            target_list = [
-                "ACEITE DE SOYA NUTRIOLI BOT 850 ML", "ACEITE COMESTIBLE NUTRIOLI 400 ML",
-                "ACEITE COMESTIBLE SABROSANO 850 ML", "ACEITE COMESTIBLE GRAN TRADICION 800 ML",
-                "ACEITE NUTRIOLI PROTECT DEFENSAS 850ML", "ACEITE NUTRIOLI PROTECT MENTE 850 ML",
-                "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML", "ACEITE COMESTIBLE NUTRIOLI ANTIGOTEO 700",
-                "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML",
-                "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", "ADERE OLI OLIVA PARA COCINAR 500 ML OLI",
-                "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ",
-                "ADEREZO OLI 500 ML BOT", "ACEITE COMESTIBLE AVE 850 ML",
-                "ACEITE COMESTIBLE AEROSOL 170GR", "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML",
-                "ACEITE OLIVA OLI PURO SPRAY 145 ML", "ACEITE OLIVA OLI EV SPRAY 145 ML",
-                "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR",
-                "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", "PASTA CODO NUTRIOLI VERDURAS 200GR",
-                "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", "PASTA SPAGHETTI NUTRIOLI 200GR",
-                "PASTA CODO NUTRIOLI 200GR", "VINAGRE BALSAMICO 250ML"
-            ]
-            res_rows = []
-            dff['DESC_CLEAN'] = dff["DESCRIPCION"].astype(str).str.upper().str.replace(r'&NBSP;', ' ', regex=True).str.strip()
+            if st.session_state.s_sug:
+                reorder_panel("SORIANA", dff, reorder_key)
+
+            elif st.session_state.s_dias_prod:
+                st.subheader("📋 Días Inventario x Producto")
+                target_list = [
+                    "ACEITE DE SOYA NUTRIOLI BOT 850 ML", "ACEITE COMESTIBLE NUTRIOLI 400 ML",
+                    "ACEITE COMESTIBLE SABROSANO 850 ML", "ACEITE COMESTIBLE GRAN TRADICION 800 ML",
+                    "ACEITE NUTRIOLI PROTECT DEFENSAS 850ML", "ACEITE NUTRIOLI PROTECT MENTE 850 ML",
+                    "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML", "ACEITE COMESTIBLE NUTRIOLI ANTIGOTEO 700",
+                    "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML",
+                    "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", "ADERE OLI OLIVA PARA COCINAR 500 ML OLI",
+                    "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ",
+                    "ADEREZO OLI 500 ML BOT", "ACEITE COMESTIBLE AVE 850 ML",
+                    "ACEITE COMESTIBLE AEROSOL 170GR", "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML",
+                    "ACEITE OLIVA OLI PURO SPRAY 145 ML", "ACEITE OLIVA OLI EV SPRAY 145 ML",
+                    "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR",
+                    "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", "PASTA CODO NUTRIOLI VERDURAS 200GR",
+                    "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", "PASTA SPAGHETTI NUTRIOLI 200GR",
+                    "PASTA CODO NUTRIOLI 200GR", "VINAGRE BALSAMICO 250ML"
+                ]
+                res_rows = []
+                desc_keys = dff['DESC_KEY'].astype(str)
             
-            for item in target_list:
-                clean_item = item.strip()
-                mask = dff['DESC_CLEAN'].str.contains(clean_item, case=False, regex=False)
-                if mask.any():
-                    subset = dff[mask]
-                    avg_days = subset["DIAS_INV"].mean()
-                    code = subset["CODIGO"].iloc[0]
-                    res_rows.append({"CODIGO": code, "ARTICULO": item, "DIAS INV": avg_days})
-                else:
-                    res_rows.append({"CODIGO": "-", "ARTICULO": item, "DIAS INV": 0})
-            st.dataframe(pd.DataFrame(res_rows).style.format({'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
-
-        elif st.session_state.s_dias_inv:
-            st.subheader("📅 Reporte Días Inventario")
-            val_nut = get_kpi_mean(dff, "DESCRIPCION", "DIAS_INV", "ACEITE DE SOYA NUTRIOLI BOT 850 ML")
-            val_sab = get_kpi_mean(dff, "DESCRIPCION", "DIAS_INV", "ACEITE COMESTIBLE SABROSANO 850 ML")
-            mask_pastas = dff["DESCRIPCION"].astype(str).str.contains("PASTA", case=False, na=False)
-            val_pas = dff.loc[mask_pastas, "DIAS_INV"].mean() if mask_pastas.any() else 0
+                for item in target_list:
+                    mask = desc_keys.str.contains(text_key(item), regex=False)
+                    if mask.any():
+                        subset = dff[mask]
+                        avg_days = subset["DIAS_INV"].mean()
+                        code = subset["CODIGO"].iloc[0]
+                        res_rows.append({"CODIGO": code, "ARTICULO": item, "DIAS INV": avg_days})
+                    else:
+                        res_rows.append({"CODIGO": "-", "ARTICULO": item, "DIAS INV": 0})
+                st.dataframe(pd.DataFrame(res_rows).style.format({'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
+
+            elif st.session_state.s_dias_inv:
+                st.subheader("📅 Reporte Días Inventario")
+                val_nut, val_sab, val_pas = dias_inv_kpis(dff, "SORIANA").values()
             
-            k1, k2, k3 = st.columns(3)
-            k1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 850ML</div><div class='kpi-value' style='color:#28a745;'>{val_nut:,.1f}</div></div>", unsafe_allow_html=True)
-            k2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sab:,.1f}</div></div>", unsafe_allow_html=True)
-            k3.markdown(f"<div class='kpi-card'><div class='kpi-title'>PASTAS</div><div class='kpi-value' style='color:#64DD17;'>{val_pas:,.1f}</div></div>", unsafe_allow_html=True)
+                k1, k2, k3 = st.columns(3)
+                k1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 850ML</div><div class='kpi-value' style='color:#28a745;'>{val_nut:,.1f}</div></div>", unsafe_allow_html=True)
+                k2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sab:,.1f}</div></div>", unsafe_allow_html=True)
+                k3.markdown(f"<div class='kpi-card'><div class='kpi-title'>PASTAS</div><div class='kpi-value' style='color:#64DD17;'>{val_pas:,.1f}</div></div>", unsafe_allow_html=True)
             
-            disp_sor_dias = dff[["NO_TIENDA", "TIENDA", "CODIGO", "DESCRIPCION", "INV_CAJAS", "SO_$", "SO_4SEM", "DIAS_INV"]].copy()
-            disp_sor_dias.columns = ['No.', 'TIENDA', 'CODIGO', 'ARTICULO', 'INV CAJAS', 'SELL OUT SEM', 'SELL OUT ULT 4 SEM', 'DIAS INV']
-            st.dataframe(disp_sor_dias.style.format({'INV CAJAS': "{:,.0f}", 'SELL OUT SEM': '${:,.2f}', 'SELL OUT ULT 4 SEM': '${:,.2f}', 'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
+                disp_sor_dias = dff[["NO_TIENDA", "TIENDA", "CODIGO", "DESCRIPCION", "INV_CAJAS", "SO_$", "SO_4SEM", "DIAS_INV"]].copy()
+                disp_sor_dias.columns = ['No.', 'TIENDA', 'CODIGO', 'ARTICULO', 'INV CAJAS', 'SELL OUT SEM', 'SELL OUT ULT 4 SEM', 'DIAS INV']
+                disp_sor_dias[['SELL OUT SEM', 'SELL OUT ULT 4 SEM']] = from_cents(disp_sor_dias[['SELL OUT SEM', 'SELL OUT ULT 4 SEM']])
+                st.dataframe(disp_sor_dias.style.format({'INV CAJAS': "{:,.0f}", 'SELL OUT SEM': '${:,.2f}', 'SELL OUT ULT 4 SEM': '${:,.2f}', 'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
             
-        else:
-            def get_soriana_category(desc):
-                desc = str(desc).upper().replace(" ", "")
-                if "SABROSANO" in desc: return "SABROSANO"
-                if "GRANTRADICION" in desc: return "GT"
-                if "BALSAMICO" in desc: return "BALSAMICO"
-                if "MISAZON" in desc or "MISAZÓN" in desc: return "MI SAZON"
-                if "AVE" in desc: return "AVE"
-                if "NUTRIOLI" in desc and any(k in desc for k in ["FUSILLI", "SPAGUETTI", "FIDEO", "CODO", "PASTA"]): return "PASTAS"
-                if "OLI" in desc and ("OLIVA" in desc or "EV" in desc or "AEROSOL" in desc or "ADEREZO" in desc): return "OLIVAS"
-                if "NUTRIOLI" in desc and ("400ML" in desc or "850ML" in desc) and "PROTECT" not in desc and "DEFENSAS" not in desc: return "NUTRIOLI"
-                if "NUTRIOLI" in desc: return "REST NUTRIOLI"
-                return None
-
-            c_kpi, c_chart = st.columns([1, 2])
-            with c_kpi:
-                total_so = dff['SO_$'].sum()
-                st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out Semanal</div><div class='kpi-value' style='color:#D32F2F;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
+            else:
+                c_kpi, c_chart = st.columns([1, 2])
+                with c_kpi:
+                    total_so = total_sell_out(dff, "SORIANA")
+                    st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out Semanal</div><div class='kpi-value' style='color:#D32F2F;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
             
-            with c_chart:
-                chart_data = dff.copy()
-                chart_data['Category'] = chart_data['DESCRIPCION'].apply(get_soriana_category)
-                pie_df = chart_data.dropna(subset=['Category']).groupby('Category')['SO_$'].sum().reset_index()
-                pie_df = pie_df[pie_df['SO_$'] > 0]
-                total_pie = pie_df['SO_$'].sum()
+                with c_chart:
+                    pie_df = category_sales(dff, "SORIANA")
+                    total_pie = pie_df['SO_$'].sum()
                 
-                if not pie_df.empty:
-                    pie_df['Percent'] = (pie_df['SO_$'] / total_pie) * 100
-                    domain = ["BALSAMICO", "SABROSANO", "PASTAS", "OLIVAS", "GT", "NUTRIOLI", "MI SAZON", "AVE", "REST NUTRIOLI"]
-                    range_ = ["#e012a9", "#f705ab", "#4c915d", "#97ad6a", "#7d6010", "#02c705", "#e89015", "#ff0000", "#00ff04"]
+                    if not pie_df.empty:
+                        domain = ["BALSAMICO", "SABROSANO", "PASTAS", "OLIVAS", "GT", "NUTRIOLI", "MI SAZON", "AVE", "REST NUTRIOLI"]
+                        range_ = ["#e012a9", "#f705ab", "#4c915d", "#97ad6a", "#7d6010", "#02c705", "#e89015", "#ff0000", "#00ff04"]
                     
-                    base = alt.Chart(pie_df).encode(theta=alt.Theta(field="SO_$", type="quantitative", stack=True)).properties(height=350)
-                    pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
-                        color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
-                        order=alt.Order("SO_$", sort="descending"),
-                        tooltip=['Category', alt.Tooltip('SO_$', format='$,.2f'), alt.Tooltip('Percent', format='.1f', title='%')]
-                    )
-                    text = base.mark_text(radius=145, fontSize=11).encode(
-                        text=alt.Text("label_text:N"), order=alt.Order("SO_$", sort="descending"), color=alt.value("black")
-                    ).transform_calculate(label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SO_$'], ',.0f')").transform_filter(alt.datum['SO_$'] > (total_pie * 0.025))
-                    st.altair_chart(pie + text, use_container_width=True)
-                else: st.info("Sin datos para gráfica.")
-
-            if st.session_state.s_rojo: 
-                dff = dff[dff['SIN_VTA']]
-                st.caption("📋 Vista: Sin Venta")
+                        base = alt.Chart(pie_df).encode(theta=alt.Theta(field="SO_$", type="quantitative", stack=True)).properties(height=350)
+                        pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
+                            color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
+                            order=alt.Order("SO_$", sort="descending"),
+                            tooltip=['Category', alt.Tooltip('SO_$', format='$,.2f'), alt.Tooltip('Percent', format='.1f', title='%')]
+                        )
+                        text = base.mark_text(radius=145, fontSize=11).encode(
+                            text=alt.Text("label_text:N"), order=alt.Order("SO_$", sort="descending"), color=alt.value("black")
+                        ).transform_calculate(label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SO_$'], ',.0f')").transform_filter(alt.datum['SO_$'] > (total_pie * 0.025))
+                        st.altair_chart(pie + text, use_container_width=True)
+                    else: st.info("Sin datos para gráfica.")
+
+                if st.session_state.s_rojo: 
+                    dff = dff[flag_mask(dff, "SORIANA", "INV SIN VENTA")]
+                    st.caption("📋 Vista: Sin Venta")
             
-            disp = dff[["NO_TIENDA", "TIENDA", "CODIGO", "DESCRIPCION", "INV_CAJAS", "SO_$", "SO_4SEM", "DIAS_INV"]].copy()
-            disp.columns = ['No.', 'TIENDA', 'CODIGO', 'ARTICULO', 'INV CAJAS', 'SELL OUT SEM', 'SELL OUT ULT 4 SEM', 'DIAS INV']
-            disp = disp.sort_values(by='SELL OUT ULT 4 SEM', ascending=False)
+                disp = dff[["NO_TIENDA", "TIENDA", "CODIGO", "DESCRIPCION", "INV_CAJAS", "SO_$", "SO_4SEM", "DIAS_INV"]].copy()
+                disp.columns = ['No.', 'TIENDA', 'CODIGO', 'ARTICULO', 'INV CAJAS', 'SELL OUT SEM', 'SELL OUT ULT 4 SEM', 'DIAS INV']
+                disp[['SELL OUT SEM', 'SELL OUT ULT 4 SEM']] = from_cents(disp[['SELL OUT SEM', 'SELL OUT ULT 4 SEM']])
+                disp = disp.sort_values(by='SELL OUT ULT 4 SEM', ascending=False)
             
-            whatsapp_report("SORIANA Reporte", disp)
-            st.dataframe(disp.style.format({'INV CAJAS': "{:,.0f}", 'SELL OUT SEM': '${:,.2f}', 'SELL OUT ULT 4 SEM': '${:,.2f}', 'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
+                whatsapp_report("SORIANA Reporte", disp)
+                st.dataframe(disp.style.format({'INV CAJAS': "{:,.0f}", 'SELL OUT SEM': '${:,.2f}', 'SELL OUT ULT 4 SEM': '${:,.2f}', 'DIAS INV': "{:,.1f}"}), use_container_width=True, hide_index=True)
 
-        st.divider()
-        st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
+        @st.fragment
+        def panel_ranking():
+            st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
         
-        s_mod1, s_mod2 = st.columns(2)
-        with s_mod1: sel_s_rank_st = st.multiselect("Estado (Ranking)", sorted(df_s["ESTADO"].astype(str).unique()), key="s_rnk_st")
-        with s_mod2: sel_s_rank_fmt = st.multiselect("Formato (Ranking)", sorted(df_s["FORMATO"].astype(str).unique()), key="s_rnk_fmt")
-
-        sr1, sr2 = st.columns(2, gap="small")
-        with sr1:
-            st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
-            if st.button("📊 GENERAL", key="s_rk_gen", use_container_width=True): set_s_rank('GEN')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with sr2:
-            st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
-            if st.button("🍝 PASTAS", key="s_rk_pas", use_container_width=True): set_s_rank('PAS')
-            st.markdown('</div>', unsafe_allow_html=True)
+            s_mod1, s_mod2 = st.columns(2)
+            with s_mod1: sel_s_rank_st = st.multiselect("Estado (Ranking)", sorted(df_s["ESTADO"].astype(str).unique()), key="s_rnk_st")
+            with s_mod2: sel_s_rank_fmt = st.multiselect("Formato (Ranking)", sorted(df_s["FORMATO"].astype(str).unique()), key="s_rnk_fmt")
+
+            sr1, sr2 = st.columns(2, gap="small")
+            with sr1:
+                st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
+                if st.button("📊 GENERAL", key="s_rk_gen", use_container_width=True): set_s_rank('GEN')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with sr2:
+                st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
+                if st.button("🍝 PASTAS", key="s_rk_pas", use_container_width=True): set_s_rank('PAS')
+                st.markdown('</div>', unsafe_allow_html=True)
         
-        sr3, sr4 = st.columns(2, gap="small")
-        with sr3:
-            st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
-            if st.button("🫒 OLIVAS", key="s_rk_oli", use_container_width=True): set_s_rank('OLI')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with sr4:
-            st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
-            if st.button("🍃 NUTRIOLI", key="s_rk_nut", use_container_width=True): set_s_rank('NUT')
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-        dff_s_rank = apply_filters(df_s, ["ESTADO", "FORMATO"], [sel_s_rank_st, sel_s_rank_fmt])
-
-        list_s_gen = [
-            "ACEITE COMESTIBLE NUTRIOLI ANTIGOTEO 700", "ACEITE COMESTIBLE GRAN TRADICION 900 ML", "ACEITE COMESTIBLE SABROSANO +30 850 ML", 
-            "ACEITE OLIVA OLI PURO SPRAY 145 ML", "JUSTO 850 ML", "ACEITE COMESTIBLE AEROSOL 170GR", "ACEITE COMESTIBLE AVE 850 ML", 
-            "ACEITE COMESTIBLE NUTRIOLI 400 ML", "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML", "ACEITE COMESTIBLE NUTRIOLI DHA 850 ML", 
-            "ACEITE COMESTIBLE SABROSANO 850 ML", "SABROSANO RINDE+ 850 ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", 
-            "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", "ADERE OLI OLIVA PARA COCINAR 500 ML OLI", 
-            "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ", "ADEREZO OLI 500 ML BOT", "ACEITE COMESTIBLE GRAN TRADICION 800 ML", 
-            "ACEITE DE SOYA NUTRIOLI BOT 850 ML", "VINAGRE BALSAMICO 250ML", "ACEITE NUTRIOLI PROTECT DEFENSAS 850ML", 
-            "ACEITE NUTRIOLI PROTECT MENTE 850 ML", "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR", 
-            "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", "PASTA CODO NUTRIOLI VERDURAS 200GR", "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", 
-            "PASTA SPAGHETTI NUTRIOLI 200GR", "PASTA CODO NUTRIOLI 200GR"
-        ]
-        list_s_pas = [
-            "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR", "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", 
-            "PASTA CODO NUTRIOLI VERDURAS 200GR", "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", "PASTA SPAGHETTI NUTRIOLI 200GR", 
-            "PASTA CODO NUTRIOLI 200GR"
-        ]
-        list_s_oli = [
-            "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", 
-            "ADERE OLI OLIVA PARA COCINAR 500 ML OLI", "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ", 
-            "ADEREZO OLI 500 ML BOT", "ACEITE OLIVA OLI PURO SPRAY 145 ML"
-        ]
-        list_s_nut = ["ACEITE DE SOYA NUTRIOLI BOT 850 ML"]
-
-        target_list_s = []
-        rank_title_s = ""
-        if st.session_state.s_rank_gen: target_list_s = list_s_gen; rank_title_s = "VENTA GENERAL ($)"
-        elif st.session_state.s_rank_pas: target_list_s = list_s_pas; rank_title_s = "VENTA PASTAS ($)"
-        elif st.session_state.s_rank_oli: target_list_s = list_s_oli; rank_title_s = "VENTA OLIVAS ($)"
-        elif st.session_state.s_rank_nut: target_list_s = list_s_nut; rank_title_s = "VENTA NUTRIOLI ($)"
-
-        if target_list_s:
-            dff_s_rank['DESC_CLEAN'] = dff_s_rank['DESCRIPCION'].astype(str).str.strip()
-            target_list_s_clean = [t.strip() for t in target_list_s]
+            sr3, sr4 = st.columns(2, gap="small")
+            with sr3:
+                st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
+                if st.button("🫒 OLIVAS", key="s_rk_oli", use_container_width=True): set_s_rank('OLI')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with sr4:
+                st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
+                if st.button("🍃 NUTRIOLI", key="s_rk_nut", use_container_width=True): set_s_rank('NUT')
+                st.markdown('</div>', unsafe_allow_html=True)
             
-            dff_sub = dff_s_rank[dff_s_rank["DESC_CLEAN"].isin(target_list_s_clean)]
-            if not dff_sub.empty:
-                final_s_rank = dff_sub.groupby(["NO_TIENDA", "TIENDA"])['SO_$'].sum().reset_index()
-                final_s_rank.columns = ['No Tienda', 'TIENDA', rank_title_s]
-                st.dataframe(final_s_rank.sort_values(by=rank_title_s, ascending=False).style.format({rank_title_s: "${:,.2f}"}), use_container_width=True, hide_index=True)
-            else:
-                st.warning("⚠️ No se encontraron ventas para los productos seleccionados.")
+            dff_s_rank = apply_filters(df_s, ["ESTADO", "FORMATO"], [sel_s_rank_st, sel_s_rank_fmt])
+
+            rank_mode_s = next((m for m, k in RANK_STATE["SORIANA"].items() if st.session_state[k]), None)
+            if rank_mode_s:
+                final_s_rank = sales_ranking(dff_s_rank, "SORIANA", rank_mode_s)
+                if final_s_rank is not None:
+                    rank_title_s = final_s_rank.columns[-1]
+                    st.dataframe(final_s_rank.style.format({rank_title_s: "${:,.2f}"}), use_container_width=True, hide_index=True)
+                else:
+                    st.warning("⚠️ No se encontraron ventas para los productos seleccionados.")
+
+        panel_vista(dff)
+        st.divider()
+        panel_ranking()
 
 def view_walmart(df_w):
     st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['WALMART']}'>WALMART</div>", unsafe_allow_html=True)
-    w_vars = ['w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod', 'w_rank_tiendas', 'w_rank_pastas', 'w_rank_olivas', 'w_nutri_top10']
+    w_vars = ['w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod', 'w_sug', 'w_rank_tiendas', 'w_rank_pastas', 'w_rank_olivas', 'w_nutri_top10']
     for v in w_vars: 
         if v not in st.session_state: st.session_state[v] = False
     
     def tog_w(target):
-        for v in ['w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod']:
+        for v in ['w_neg', 'w_4w', 'w_dias_inv', 'w_dias_prod', 'w_sug']:
             st.session_state[v] = True if v == target and not st.session_state[v] else False
 
     def set_rank(mode):
@@ -546,7 +486,9 @@ def view_walmart(df_w):
         elif mode == 'nutrioli': st.session_state.w_nutri_top10 = True
 
     if df_w is not None:
-        df_w = df_w[~df_w["FORMATO"].isin(['BAE','MB'])]
+        token = dataset_token(df_w)
+        store_counts = cached_store_counts(df_w, "WALMART")
+        df_w = base_frame(df_w, "WALMART")
         
         with st.expander("🔍 Filtros Avanzados", expanded=True):
             c1, c2, c3 = st.columns(3)
@@ -556,7 +498,7 @@ def view_walmart(df_w):
                 sel_state = st.multiselect("Estado", sorted(df_w["ESTADO"].astype(str).unique()))
             with c2:
                 unique_stores = sorted(df_w[df_w["ESTADO"].isin(sel_state)]["TIENDA"].astype(str).unique()) if sel_state else sorted(df_w["TIENDA"].astype(str).unique())
-                sel_store = st.multiselect("Tienda", unique_stores)
+                sel_store = search_select("Tienda", unique_stores, key="w_fil_store")
                 sel_fmt = st.multiselect("Formato", sorted(df_w["FORMATO"].astype(str).unique()))
             with c3:
                 lista_excluida_filtro = [
@@ -568,207 +510,178 @@ def view_walmart(df_w):
                 ]
                 excluidas_clean = [x.strip().upper() for x in lista_excluida_filtro]
                 opciones_prod = [p for p in df_w["DESCRIPCION"].astype(str).unique() if p.strip().upper() not in excluidas_clean]
-                sel_prod = st.multiselect("Artículo", sorted(opciones_prod))
+                sel_prod = search_select("Artículo", sorted(opciones_prod), key="w_fil_prod")
 
         dff_kpi = apply_filters(df_w, ["MARCA", "ESTADO", "TIENDA", "FORMATO"], [sel_marca, sel_state, sel_store, sel_fmt])
         dff = apply_filters(dff_kpi, ["DESCRIPCION"], [sel_prod])
-
-        b1, b2, b3 = st.columns(3, gap="small")
-        with b1: st.button("📉 NEGATIVOS", on_click=tog_w, args=('w_neg',), key="btn_w_neg", use_container_width=True)
-        with b2: st.button("🔴 SIN VTA 4SEM", on_click=tog_w, args=('w_4w',), key="btn_w_4w", use_container_width=True)
-        with b3: 
-            st.markdown(f'<div class="{"rank-green-on" if st.session_state.w_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
-            st.button("📅 DIAS INV", on_click=tog_w, args=('w_dias_inv',), key="btn_w_dias", use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+        reorder_key = (token, sel_marca, sel_state, sel_store, sel_fmt, sel_prod)
+        alerts_panel("WALMART", dff, store_counts)
+
+        @st.fragment
+        def panel_vista(dff, dff_kpi):
+            exc_counts = flag_counts(dff, "WALMART")
+            b1, b2, b3 = st.columns(3, gap="small")
+            with b1: st.button(badge("📉 NEGATIVOS", exc_counts, "NEGATIVOS"), on_click=tog_w, args=('w_neg',), key="btn_w_neg", use_container_width=True)
+            with b2: st.button(badge("🔴 SIN VTA 4SEM", exc_counts, "SIN VTA 4SEM"), on_click=tog_w, args=('w_4w',), key="btn_w_4w", use_container_width=True)
+            with b3: 
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.w_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("📅 DIAS INV", on_click=tog_w, args=('w_dias_inv',), key="btn_w_dias", use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
         
-        br1, br2 = st.columns(2, gap="small")
-        with br1:
-            st.markdown(f'<div class="{"rank-green-on" if st.session_state.w_dias_prod else "dias-inv-style"}">', unsafe_allow_html=True)
-            st.button("📋 DIAS X PROD", on_click=tog_w, args=('w_dias_prod',), key="btn_w_dias_prod", use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        if st.session_state.w_neg: dff = dff[dff["EXISTENCIA"] < 0]; st.warning("VISTA: NEGATIVOS")
-        if st.session_state.w_4w: dff = dff[(dff.iloc[:,73]==0)&(dff.iloc[:,74]==0)&(dff.iloc[:,75]==0)&(dff.iloc[:,76]==0)]; st.warning("VISTA: SIN VENTA 4 SEMANAS")
-
-        # Configuración BORGES
-        borges_list = [
-            "BORGES ACEITE OLIVA EXTRA VIRGEN 500", "BORGES ACEITE OLIVA EXTRA SUAVE", 
-            "ACEITE DE OLIVA EXTRA VIRGEN KOSHER", "ACEITE DE OLIVA A LA ALBAHACA FRESCA", 
-            "ACEITE DE SOJA JENGIBRE", "ACEITE DE OLIVA AL AJO FRITO", 
-            "ACEITE DE OLIVA AL  ROMERO FRESCO", "BORGES ACEITE DE PEPITA UVA 500ML", 
-            "BORGES ACEITE DE OLIVA EXTRA VIRGEN ECOL", "BORGES VINAGRE BALSAMICO 250ML", 
-            "VINAGRE DE JEREZ 250 ML", "VINAGRE DE SIDRA 250 ML", "VINAGRE DE VINO FRAMBUESA", 
-            "VINAGRE DE VINO AL  AJO 250 ML", "BORGES VINAGRE VINO BLANCO", 
-            "VINAGRE DE MANZANA ECOLOGICO", "BORGES VINAGRE DE VINOTINTO", 
-            "VINAGRE DE VINO DE RIOJA BOTELLA 250ML", "BORGES ACEITE OLIVA 100 PURO CON AJO"
-        ]
-        borges_clean = [x.replace(" ", "").upper() for x in borges_list]
-
-        def get_walmart_category(desc):
-            desc_clean = str(desc).upper().replace(" ", "").replace("&NBSP;", "")
-            
-            if any(b in desc_clean for b in borges_clean): return "BORGES"
-            
-            if "NUTRIOLI" in desc_clean and "946" in desc_clean: return "NUTRIOLI"
-            
-            if "SABROSANO" in desc_clean: return "SABROSANO"
-            if "GRANTRADICION" in desc_clean: return "GT"
-            if "BALSAMICO" in desc_clean: return "BALSAMICO"
-            if any(k in desc_clean for k in ["OLISPRAY", "OLICOCINA", "OLIDENUTEV", "ACEITEOLIDEOLIVA", "OLIDENUT"]) and "BALSAMICO" not in desc_clean: return "OLIVAS"
-            if "NUTRIOLI" in desc_clean and any(x in desc_clean for x in ["SPAGUETTI", "FIDEO", "CODO", "PASTA"]): return "PASTAS"
-            if "NUTRIOLI" in desc_clean: return "REST NUTRIOLI"
-            return None
-
-        if st.session_state.w_dias_prod:
-            st.subheader("📋 Días Inventario x Producto")
-            target_list = [
-                "NUTRIOLI ACEITE PURO DE SOYA 946 ML", "NUTRIOLI ACEITE PURO DE SOYA 400 ML", 
-                "SABROSANO ACEITE 850ML MANTEQUILLA", "ACEITE COMESTIBLE GRAN TRADICION 850ML", 
-                "ACEITE SOYA NUTRIOLI ANTIGOTEO 700ML", "ACEITE NUTRIOLI DEFENSAS 850 ML", 
-                "NUTRIOLI ACEITE PROTECT MENTE 850 ML", "NUTRIOLI SPRAY 180 ML", 
-                "AVE AEROSOL 170GR", "OLI SPRAY ACEITE DE OLIVA 145ML", 
-                "OLI SPRAY ACEITE DE OLIVA EV 145ML", "OLI DE NUTRIOLI EXTRA VIRGEN 250ML", 
-                "OLI DE NUTRIOLI ACEITE DE OLIVA 500ML", "OLI DE NUTRIOLI ACEITE DE OLIVA 750ML", 
-                "OLI ACEITE DE OLIVA COCINA 250ML", "ACEITE DE OLIVA EXTRA VIRGEN OLI DE NUTR", 
-                "ACEITE OLI DE OLIVA EX VIRGEN ORGANICO", "OLI NUTRIOLI VINAGRE BALSAMICO MODENA250", 
-                "VINAGRE DE JEREZ 250 ML", "VINAGRE DE MANZANA ECOLOGICO", "VINAGRE DE SIDRA 250 ML", 
-                "VINAGRE DE VINO AL  AJO 250 ML", "VINAGRE DE VINO DE RIOJA BOTELLA 250ML", 
-                "VINAGRE DE VINO FRAMBUESA", "BORGES ACEITE DE OLIVA EXTRA VIRGEN ECOL", 
-                "BORGES ACEITE DE PEPITA UVA 500ML", "BORGES ACEITE OLIVA 100 PURO CON AJO", 
-                "BORGES ACEITE OLIVA EXTRA SUAVE", "BORGES ACEITE OLIVA EXTRA VIRGEN 500", 
-                "BORGES VINAGRE BALSAMICO 250ML", "BORGES VINAGRE DE VINOTINTO", 
-                "BORGES VINAGRE VINO BLANCO", "ACEITE DE OLIVA A LA ALBAHACA FRESCA", 
-                "ACEITE DE OLIVA AL  ROMERO FRESCO", "ACEITE DE OLIVA AL AJO FRITO", 
-                "ACEITE DE OLIVA EXTRA VIRGEN KOSHER", "ACEITE DE SOJA JENGIBRE"
-            ]
-            res_rows = []
-            dff_kpi['DESC_NOSPACE'] = dff_kpi["DESCRIPCION"].astype(str).str.upper().str.replace(r'&NBSP;', '', regex=True).str.replace(" ", "", regex=False)
+            br1, br2 = st.columns(2, gap="small")
+            with br1:
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.w_dias_prod else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("📋 DIAS X PROD", on_click=tog_w, args=('w_dias_prod',), key="btn_w_dias_prod", use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+            with br2:
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.w_sug else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("🛒 SUGERIDO", on_click=tog_w, args=('w_sug',), key="btn_w_sug", use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            if st.session_state.w_neg: dff = dff[flag_mask(dff, "WALMART", "NEGATIVOS")]; st.warning("VISTA: NEGATIVOS")
+            if st.session_state.w_4w: dff = dff[flag_mask(dff, "WALMART", "SIN VTA 4SEM")]; st.warning("VISTA: SIN VENTA 4 SEMANAS")
+
+            if st.session_state.w_sug:
+                reorder_panel("WALMART", dff, reorder_key)
+
+            elif st.session_state.w_dias_prod:
+                st.subheader("📋 Días Inventario x Producto")
+                target_list = [
+                    "NUTRIOLI ACEITE PURO DE SOYA 946 ML", "NUTRIOLI ACEITE PURO DE SOYA 400 ML", 
+                    "SABROSANO ACEITE 850ML MANTEQUILLA", "ACEITE COMESTIBLE GRAN TRADICION 850ML", 
+                    "ACEITE SOYA NUTRIOLI ANTIGOTEO 700ML", "ACEITE NUTRIOLI DEFENSAS 850 ML", 
+                    "NUTRIOLI ACEITE PROTECT MENTE 850 ML", "NUTRIOLI SPRAY 180 ML", 
+                    "AVE AEROSOL 170GR", "OLI SPRAY ACEITE DE OLIVA 145ML", 
+                    "OLI SPRAY ACEITE DE OLIVA EV 145ML", "OLI DE NUTRIOLI EXTRA VIRGEN 250ML", 
+                    "OLI DE NUTRIOLI ACEITE DE OLIVA 500ML", "OLI DE NUTRIOLI ACEITE DE OLIVA 750ML", 
+                    "OLI ACEITE DE OLIVA COCINA 250ML", "ACEITE DE OLIVA EXTRA VIRGEN OLI DE NUTR", 
+                    "ACEITE OLI DE OLIVA EX VIRGEN ORGANICO", "OLI NUTRIOLI VINAGRE BALSAMICO MODENA250", 
+                    "VINAGRE DE JEREZ 250 ML", "VINAGRE DE MANZANA ECOLOGICO", "VINAGRE DE SIDRA 250 ML", 
+                    "VINAGRE DE VINO AL  AJO 250 ML", "VINAGRE DE VINO DE RIOJA BOTELLA 250ML", 
+                    "VINAGRE DE VINO FRAMBUESA", "BORGES ACEITE DE OLIVA EXTRA VIRGEN ECOL", 
+                    "BORGES ACEITE DE PEPITA UVA 500ML", "BORGES ACEITE OLIVA 100 PURO CON AJO", 
+                    "BORGES ACEITE OLIVA EXTRA SUAVE", "BORGES ACEITE OLIVA EXTRA VIRGEN 500", 
+                    "BORGES VINAGRE BALSAMICO 250ML", "BORGES VINAGRE DE VINOTINTO", 
+                    "BORGES VINAGRE VINO BLANCO", "ACEITE DE OLIVA A LA ALBAHACA FRESCA", 
+                    "ACEITE DE OLIVA AL  ROMERO FRESCO", "ACEITE DE OLIVA AL AJO FRITO", 
+                    "ACEITE DE OLIVA EXTRA VIRGEN KOSHER", "ACEITE DE SOJA JENGIBRE"
+                ]
+                res_rows = []
+                desc_keys = dff_kpi['DESC_KEY'].astype(str)
             
-            for item in target_list:
-                clean_item = item.upper().replace("&NBSP;", "").replace(" ", "")
-                mask = dff_kpi['DESC_NOSPACE'].str.contains(clean_item, case=False, regex=False)
-                if mask.any():
-                    subset = dff_kpi[mask]
-                    avg_days = subset["DIAS_INV"].mean()
-                    sum_so = subset["SO_$"].sum()
-                    code = subset["CODIGO"].iloc[0]
-                    res_rows.append({"CODIGO": code, "ARTICULO": item, "DIAS DE INV": avg_days, "SELL OUT": sum_so})
-                else:
-                    res_rows.append({"CODIGO": "-", "ARTICULO": item, "DIAS DE INV": 0, "SELL OUT": 0})
+                for item in target_list:
+                    mask = desc_keys.str.contains(text_key(item), regex=False)
+                    if mask.any():
+                        subset = dff_kpi[mask]
+                        avg_days = subset["DIAS_INV"].mean()
+                        sum_so = from_cents(subset["SO_$"].sum())
+                        code = subset["CODIGO"].iloc[0]
+                        res_rows.append({"CODIGO": code, "ARTICULO": item, "DIAS DE INV": avg_days, "SELL OUT": sum_so})
+                    else:
+                        res_rows.append({"CODIGO": "-", "ARTICULO": item, "DIAS DE INV": 0, "SELL OUT": 0})
             
-            df_prod_summary = pd.DataFrame(res_rows)
-            st.dataframe(df_prod_summary.style.format({'DIAS DE INV': "{:,.1f}", 'SELL OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
-
-        elif st.session_state.w_dias_inv:
-            st.subheader("📅 Reporte Días Inventario")
-            val_nutri = get_kpi_mean(dff_kpi, "DESCRIPCION", "DIAS_INV", "NUTRIOLI ACEITE PURO DE SOYA 946 ML")
-            val_sabro = get_kpi_mean(dff_kpi, "DESCRIPCION", "DIAS_INV", "SABROSANO ACEITE 850ML MANTEQUILLA")
-            val_ave = get_kpi_mean(dff_kpi, "DESCRIPCION", "DIAS_INV", "ACEITE AVE 850ML")
-            val_gran = get_kpi_mean(dff_kpi, "DESCRIPCION", "DIAS_INV", "ACEITE COMESTIBLE GRAN TRADICION 850ML")
+                df_prod_summary = pd.DataFrame(res_rows)
+                st.dataframe(df_prod_summary.style.format({'DIAS DE INV': "{:,.1f}", 'SELL OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
+
+            elif st.session_state.w_dias_inv:
+                st.subheader("📅 Reporte Días Inventario")
+                val_nutri, val_sabro, val_ave, val_gran = dias_inv_kpis(dff_kpi, "WALMART").values()
             
-            m1, m2, m3, m4 = st.columns(4)
-            m1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 946M</div><div class='kpi-value' style='color:#28a745;'>{val_nutri:,.1f}</div></div>", unsafe_allow_html=True)
-            m2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sabro:,.1f}</div></div>", unsafe_allow_html=True)
-            m3.markdown(f"<div class='kpi-card'><div class='kpi-title'>AVE 850ML</div><div class='kpi-value' style='color:#D32F2F;'>{val_ave:,.1f}</div></div>", unsafe_allow_html=True)
-            m4.markdown(f"<div class='kpi-card'><div class='kpi-title'>GRAN TRADICION</div><div class='kpi-value' style='color:#8B4513;'>{val_gran:,.1f}</div></div>", unsafe_allow_html=True)
+                m1, m2, m3, m4 = st.columns(4)
+                m1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 946M</div><div class='kpi-value' style='color:#28a745;'>{val_nutri:,.1f}</div></div>", unsafe_allow_html=True)
+                m2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sabro:,.1f}</div></div>", unsafe_allow_html=True)
+                m3.markdown(f"<div class='kpi-card'><div class='kpi-title'>AVE 850ML</div><div class='kpi-value' style='color:#D32F2F;'>{val_ave:,.1f}</div></div>", unsafe_allow_html=True)
+                m4.markdown(f"<div class='kpi-card'><div class='kpi-title'>GRAN TRADICION</div><div class='kpi-value' style='color:#8B4513;'>{val_gran:,.1f}</div></div>", unsafe_allow_html=True)
             
-            st.dataframe(dff[["TIENDA", "CODIGO", "DESCRIPCION", "DIAS_INV"]].rename(columns={"DIAS_INV":"DIAS INVENTARIO"}).style.format({'DIAS INVENTARIO': "{:,.1f}"}), use_container_width=True, hide_index=True)
+                st.dataframe(dff[["TIENDA", "CODIGO", "DESCRIPCION", "DIAS_INV"]].rename(columns={"DIAS_INV":"DIAS INVENTARIO"}).style.format({'DIAS INVENTARIO': "{:,.1f}"}), use_container_width=True, hide_index=True)
             
-        else:
-            c_kpi, c_chart = st.columns([1, 2])
-            total_so = dff['SO_$'].sum()
+            else:
+                c_kpi, c_chart = st.columns([1, 2])
+                total_so = total_sell_out(dff, "WALMART")
             
-            with c_kpi:
-                st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out</div><div class='kpi-value' style='color:#28a745;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
+                with c_kpi:
+                    st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out</div><div class='kpi-value' style='color:#28a745;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
             
-            with c_chart:
-                chart_data = dff.copy()
-                chart_data['Category'] = chart_data['DESCRIPCION'].apply(get_walmart_category)
-                pie_df = chart_data.dropna(subset=['Category']).groupby('Category')['SO_$'].sum().reset_index()
-                pie_df = pie_df[pie_df['SO_$'] > 0]
-                total_pie = pie_df['SO_$'].sum()
+                with c_chart:
+                    pie_df = category_sales(dff, "WALMART")
+                    total_pie = pie_df['SO_$'].sum()
                 
-                if not pie_df.empty:
-                    pie_df['Percent'] = (pie_df['SO_$'] / total_pie) * 100
-                    domain = ["SABROSANO", "GT", "OLIVAS", "BALSAMICO", "PASTAS", "REST NUTRIOLI", "NUTRIOLI", "BORGES"]
-                    range_ = ["#E4007C", "#a18262", "#6B8E23", "#9f4576", "#426045", "#bfff00", "#008f39", "#FF0000"]
+                    if not pie_df.empty:
+                        domain = ["SABROSANO", "GT", "OLIVAS", "BALSAMICO", "PASTAS", "REST NUTRIOLI", "NUTRIOLI", "BORGES"]
+                        range_ = ["#E4007C", "#a18262", "#6B8E23", "#9f4576", "#426045", "#bfff00", "#008f39", "#FF0000"]
                     
-                    base = alt.Chart(pie_df).encode(
-                        theta=alt.Theta(field="SO_$", type="quantitative", stack=True)
-                    ).properties(height=350)
+                        base = alt.Chart(pie_df).encode(
+                            theta=alt.Theta(field="SO_$", type="quantitative", stack=True)
+                        ).properties(height=350)
                     
-                    pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
-                        color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
-                        order=alt.Order("SO_$", sort="descending"),
-                        tooltip=['Category', alt.Tooltip('SO_$', format='$,.2f'), alt.Tooltip('Percent', format='.1f', title='%')]
-                    )
+                        pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
+                            color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
+                            order=alt.Order("SO_$", sort="descending"),
+                            tooltip=['Category', alt.Tooltip('SO_$', format='$,.2f'), alt.Tooltip('Percent', format='.1f', title='%')]
+                        )
                     
-                    text = base.mark_text(radius=145, fontSize=11).encode(
-                        text=alt.Text("label_text:N"), order=alt.Order("SO_$", sort="descending"), color=alt.value("black")
-                    ).transform_calculate(
-                        label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SO_$'], ',.0f')"
-                    ).transform_filter(
-                        (alt.datum['SO_$'] > (total_pie * 0.025)) | (alt.datum['Category'] == 'BORGES')
-                    )
+                        text = base.mark_text(radius=145, fontSize=11).encode(
+                            text=alt.Text("label_text:N"), order=alt.Order("SO_$", sort="descending"), color=alt.value("black")
+                        ).transform_calculate(
+                            label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SO_$'], ',.0f')"
+                        ).transform_filter(
+                            (alt.datum['SO_$'] > (total_pie * 0.025)) | (alt.datum['Category'] == 'BORGES')
+                        )
                     
-                    st.altair_chart(pie + text, use_container_width=True)
-                else: st.info("Sin datos para gráfica.")
-
-            disp = dff[["CODIGO", "DESCRIPCION", "TIENDA", "EXISTENCIA", "SO_$", "PROM_PZS_MENSUAL"]].copy()
-            disp.columns = ['CODIGO', 'DESCRIPCION', 'TIENDA', 'EXISTENCIA', 'SELL OUT', 'PROM PZS MENSUAL']
-            whatsapp_report("WALMART Reporte", disp)
-            st.dataframe(disp.style.format({'SELL OUT': '${:,.2f}', 'PROM PZS MENSUAL': '{:,.2f}'}), use_container_width=True, hide_index=True)
-
-        st.divider()
-        st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
-        c_mod1, c_mod2 = st.columns(2)
-        with c_mod1: sel_st_rank = st.multiselect("Estado (Ranking)", sorted(df_w["ESTADO"].astype(str).unique()), key="rnk_st")
-        with c_mod2: sel_fmt_rank = st.multiselect("Formato (Ranking)", sorted(df_w["FORMATO"].astype(str).unique()), key="rnk_fmt")
+                        st.altair_chart(pie + text, use_container_width=True)
+                    else: st.info("Sin datos para gráfica.")
+
+                disp = dff[["CODIGO", "DESCRIPCION", "TIENDA", "EXISTENCIA", "SO_$", "PROM_PZS_MENSUAL"]].copy()
+                disp.columns = ['CODIGO', 'DESCRIPCION', 'TIENDA', 'EXISTENCIA', 'SELL OUT', 'PROM PZS MENSUAL']
+                disp['SELL OUT'] = from_cents(disp['SELL OUT'])
+                whatsapp_report("WALMART Reporte", disp)
+                st.dataframe(disp.style.format({'SELL OUT': '${:,.2f}', 'PROM PZS MENSUAL': '{:,.2f}'}), use_container_width=True, hide_index=True)
+
+        @st.fragment
+        def panel_ranking():
+            st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
+            c_mod1, c_mod2 = st.columns(2)
+            with c_mod1: sel_st_rank = st.multiselect("Estado (Ranking)", sorted(df_w["ESTADO"].astype(str).unique()), key="rnk_st")
+            with c_mod2: sel_fmt_rank = st.multiselect("Formato (Ranking)", sorted(df_w["FORMATO"].astype(str).unique()), key="rnk_fmt")
         
-        r1, r2 = st.columns(2, gap="small")
-        with r1:
-            st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
-            if st.button("📊 GENERAL", key="rk_gen", use_container_width=True): set_rank('tiendas')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with r2:
-            st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
-            if st.button("🍝 PASTAS", key="rk_pas", use_container_width=True): set_rank('pastas')
-            st.markdown('</div>', unsafe_allow_html=True)
-        r3, r4 = st.columns(2, gap="small")
-        with r3:
-            st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
-            if st.button("🫒 OLIVAS", key="rk_oli", use_container_width=True): set_rank('olivas')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with r4:
-            st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
-            if st.button("🏆 NUTRIOLI", key="rk_nut", use_container_width=True): set_rank('nutrioli')
-            st.markdown('</div>', unsafe_allow_html=True)
+            r1, r2 = st.columns(2, gap="small")
+            with r1:
+                st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
+                if st.button("📊 GENERAL", key="rk_gen", use_container_width=True): set_rank('tiendas')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with r2:
+                st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
+                if st.button("🍝 PASTAS", key="rk_pas", use_container_width=True): set_rank('pastas')
+                st.markdown('</div>', unsafe_allow_html=True)
+            r3, r4 = st.columns(2, gap="small")
+            with r3:
+                st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
+                if st.button("🫒 OLIVAS", key="rk_oli", use_container_width=True): set_rank('olivas')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with r4:
+                st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
+                if st.button("🏆 NUTRIOLI", key="rk_nut", use_container_width=True): set_rank('nutrioli')
+                st.markdown('</div>', unsafe_allow_html=True)
             
-        dff_rank = apply_filters(df_w, ["ESTADO", "FORMATO"], [sel_st_rank, sel_fmt_rank])
-        final_rank = None
-        if st.session_state.w_rank_tiendas:
-            final_rank = dff_rank.groupby("TIENDA")['SO_$'].sum().reset_index().rename(columns={'SO_$':'VENTA TOTAL ($)'})
-        elif st.session_state.w_rank_pastas:
-            df_sub = dff_rank[dff_rank["CATEGORIA"].str.contains("PASTAS", case=False, na=False)]
-            if not df_sub.empty: final_rank = df_sub.groupby("TIENDA")['SO_$'].sum().reset_index().rename(columns={'SO_$':'VENTA PASTAS ($)'})
-        elif st.session_state.w_rank_olivas:
-            df_sub = dff_rank[dff_rank["DESCRIPCION"].str.contains("OLI", case=False, na=False)]
-            if not df_sub.empty: final_rank = df_sub.groupby("TIENDA")['SO_$'].sum().reset_index().rename(columns={'SO_$':'VENTA OLIVAS ($)'})
-        elif st.session_state.w_nutri_top10:
-            df_sub = dff_rank[dff_rank["DESCRIPCION"].str.contains("NUTRIOLI 946M", case=False, na=False)]
-            if not df_sub.empty: final_rank = df_sub.groupby("TIENDA")['SO_$'].sum().reset_index().rename(columns={'SO_$':'VENTA NUTRIOLI ($)'}).sort_values(by='VENTA NUTRIOLI ($)', ascending=False).head(10)
+            dff_rank = apply_filters(df_w, ["ESTADO", "FORMATO"], [sel_st_rank, sel_fmt_rank])
+            rank_mode = next((m for m, k in RANK_STATE["WALMART"].items() if st.session_state[k]), None)
+            final_rank = sales_ranking(dff_rank, "WALMART", rank_mode) if rank_mode else None
         
-        if final_rank is not None:
-            st.dataframe(final_rank.sort_values(by=final_rank.columns[1], ascending=False).style.format({final_rank.columns[1]: "${:,.2f}"}), use_container_width=True, hide_index=True)
+            if final_rank is not None:
+                st.dataframe(final_rank.style.format({final_rank.columns[1]: "${:,.2f}"}), use_container_width=True, hide_index=True)
+
+        panel_vista(dff, dff_kpi)
+        st.divider()
+        panel_ranking()
 
 def view_chedraui(df_c):
     st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['CHEDRAUI']}'>CHEDRAUI</div>", unsafe_allow_html=True)
-    c_vars = ['c_neg_zero', 'c_under_10', 'c_dias_inv', 'c_rank_gen', 'c_rank_pas', 'c_rank_oli', 'c_rank_nut']
+    c_vars = ['c_neg_zero', 'c_under_10', 'c_dias_inv', 'c_sug', 'c_rank_gen', 'c_rank_pas', 'c_rank_oli', 'c_rank_nut']
     for v in c_vars:
         if v not in st.session_state: st.session_state[v] = False
     
     def tog_c(target):
-        for v in ['c_neg_zero', 'c_under_10', 'c_dias_inv']:
+        for v in ['c_neg_zero', 'c_under_10', 'c_dias_inv', 'c_sug']:
             st.session_state[v] = True if v == target and not st.session_state[v] else False
 
     def set_c_rank(mode):
@@ -783,133 +696,119 @@ def view_chedraui(df_c):
             c1, c2 = st.columns(2)
             with c1:
                 fil_no = st.multiselect("No Tienda", sorted(df_c["NO_TIENDA"].astype(str).unique()))
-                fil_ti = st.multiselect("Tienda", sorted(df_c["TIENDA"].astype(str).unique()))
+                fil_ti = search_select("Tienda", sorted(df_c["TIENDA"].astype(str).unique()), key="c_fil_ti")
                 fil_cat = st.multiselect("Categoría", sorted(df_c["CATEGORIA"].astype(str).unique()))
             with c2:
                 fil_ed = st.multiselect("Estado", sorted(df_c["ESTADO"].astype(str).unique()))
-                fil_art = st.multiselect("Artículo", sorted(df_c["ARTICULO"].astype(str).unique()))
+                fil_art = search_select("Artículo", sorted(df_c["ARTICULO"].astype(str).unique()), key="c_fil_art")
 
         dff_base = apply_filters(df_c, ["NO_TIENDA", "TIENDA", "ESTADO", "CATEGORIA"], [fil_no, fil_ti, fil_ed, fil_cat])
         dff = apply_filters(dff_base, ["ARTICULO"], [fil_art])
-
-        b1, b2, b3 = st.columns(3, gap="small")
-        with b1: st.button("📉 NEGATIVO / 0", on_click=tog_c, args=('c_neg_zero',), key="btn_che_nz", use_container_width=True, type="primary")
-        with b2: st.button("⚠️ DIAS INV < 10", on_click=tog_c, args=('c_under_10',), key="btn_che_u10", use_container_width=True, type="primary")
-        with b3: 
-            st.markdown(f'<div class="{"rank-green-on" if st.session_state.c_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
-            st.button("📅 DIAS INV", on_click=tog_c, args=('c_dias_inv',), key="btn_che_dias", use_container_width=True)
+        reorder_key = (dataset_token(df_c), fil_no, fil_ti, fil_ed, fil_cat, fil_art)
+        alerts_panel("CHEDRAUI", dff, cached_store_counts(df_c, "CHEDRAUI"))
+
+        @st.fragment
+        def panel_vista(dff, dff_base):
+            exc_counts = flag_counts(dff, "CHEDRAUI")
+            b1, b2, b3 = st.columns(3, gap="small")
+            with b1: st.button(badge("📉 NEGATIVO / 0", exc_counts, "NEGATIVO / 0"), on_click=tog_c, args=('c_neg_zero',), key="btn_che_nz", use_container_width=True, type="primary")
+            with b2: st.button(badge("⚠️ DIAS INV < 10", exc_counts, "DIAS INV < 10"), on_click=tog_c, args=('c_under_10',), key="btn_che_u10", use_container_width=True, type="primary")
+            with b3: 
+                st.markdown(f'<div class="{"rank-green-on" if st.session_state.c_dias_inv else "dias-inv-style"}">', unsafe_allow_html=True)
+                st.button("📅 DIAS INV", on_click=tog_c, args=('c_dias_inv',), key="btn_che_dias", use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="{"rank-green-on" if st.session_state.c_sug else "dias-inv-style"}">', unsafe_allow_html=True)
+            st.button("🛒 SUGERIDO", on_click=tog_c, args=('c_sug',), key="btn_che_sug", use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
-        if st.session_state.c_dias_inv:
-            st.subheader("📅 Reporte Días Inventario")
-            val_nut = get_kpi_mean(dff_base, "ARTICULO", "DIAS_INV", "Nutrioli Bot 850")
-            val_sab = get_kpi_mean(dff_base, "ARTICULO", "DIAS_INV", "Sabrosano Mixto 850")
-            val_ave = get_kpi_mean(dff_base, "ARTICULO", "DIAS_INV", "Ave Soya-Canola 850")
-            k1, k2, k3 = st.columns(3)
-            k1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 850ML</div><div class='kpi-value' style='color:#28a745;'>{val_nut:,.1f}</div></div>", unsafe_allow_html=True)
-            k2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sab:,.1f}</div></div>", unsafe_allow_html=True)
-            k3.markdown(f"<div class='kpi-card'><div class='kpi-title'>AVE 850ML</div><div class='kpi-value' style='color:#D32F2F;'>{val_ave:,.1f}</div></div>", unsafe_allow_html=True)
+            if st.session_state.c_sug:
+                reorder_panel("CHEDRAUI", dff, reorder_key)
+
+            elif st.session_state.c_dias_inv:
+                st.subheader("📅 Reporte Días Inventario")
+                val_nut, val_sab, val_ave = dias_inv_kpis(dff_base, "CHEDRAUI").values()
+                k1, k2, k3 = st.columns(3)
+                k1.markdown(f"<div class='kpi-card'><div class='kpi-title'>NUTRIOLI 850ML</div><div class='kpi-value' style='color:#28a745;'>{val_nut:,.1f}</div></div>", unsafe_allow_html=True)
+                k2.markdown(f"<div class='kpi-card'><div class='kpi-title'>SABROSANO 850ML</div><div class='kpi-value' style='color:#E4007C;'>{val_sab:,.1f}</div></div>", unsafe_allow_html=True)
+                k3.markdown(f"<div class='kpi-card'><div class='kpi-title'>AVE 850ML</div><div class='kpi-value' style='color:#D32F2F;'>{val_ave:,.1f}</div></div>", unsafe_allow_html=True)
             
-            disp = dff[["NO_TIENDA", "TIENDA", "ARTICULO", "INV_ULT_SEM", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]].copy()
-            disp.columns = ['NO_TIENDA', 'TIENDA', 'ARTICULO', 'INV_ULT_SEM', 'VTA_PROM_DIARIA', 'DIAS_INV', 'SELL_OUT']
-            st.dataframe(disp.style.format({'INV_ULT_SEM': "{:,.0f}", 'VTA_PROM_DIARIA': "{:,.2f}", 'DIAS_INV': "{:,.1f}", 'SELL_OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
+                disp = dff[["NO_TIENDA", "TIENDA", "ARTICULO", "INV_ULT_SEM", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]].copy()
+                disp.columns = ['NO_TIENDA', 'TIENDA', 'ARTICULO', 'INV_ULT_SEM', 'VTA_PROM_DIARIA', 'DIAS_INV', 'SELL_OUT']
+                disp['SELL_OUT'] = from_cents(disp['SELL_OUT'])
+                st.dataframe(disp.style.format({'INV_ULT_SEM': "{:,.0f}", 'VTA_PROM_DIARIA': "{:,.2f}", 'DIAS_INV': "{:,.1f}", 'SELL_OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
             
-        else:
-            def get_chedraui_category(desc):
-                desc = str(desc).upper().replace(" ", "")
-                if "BALSAMICO" in desc: return "BALSAMICO"
-                if "SABROSANO" in desc: return "SABROSANO"
-                if "GRANTRADICION" in desc: return "GT"
-                if "MISAZON" in desc or "MISAZÓN" in desc: return "MI SAZON"
-                if "AVE" in desc and ("SOYA-CANOLA" in desc or "AEROSOL" in desc): return "AVE"
-                if "NUTRIOLI" in desc and any(k in desc for k in ["FUSILLI", "SPAGUETTI", "FIDEO", "CODO"]): return "PASTAS"
-                if "OLI" in desc and ("OLIVA" in desc or "EV" in desc or "AEROSOL" in desc): return "OLIVAS"
-                if "NUTRIOLI" in desc and ("400ML" in desc or "850ML" in desc) and "PROTECT" not in desc and "DEFENSAS" not in desc: return "NUTRIOLI"
-                if "NUTRIOLI" in desc: return "REST NUTRIOLI"
-                return None
-
-            c_kpi, c_chart = st.columns([1, 2])
-            with c_kpi:
-                total_so = dff['SELL_OUT'].sum()
-                st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out</div><div class='kpi-value' style='color:#FF6600;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
-            with c_chart:
-                chart_data = dff.copy()
-                chart_data['Category'] = chart_data['ARTICULO'].apply(get_chedraui_category)
-                pie_df = chart_data.dropna(subset=['Category']).groupby('Category')['SELL_OUT'].sum().reset_index()
-                pie_df = pie_df[pie_df['SELL_OUT'] > 0]
-                total_pie = pie_df['SELL_OUT'].sum()
+            else:
+                c_kpi, c_chart = st.columns([1, 2])
+                with c_kpi:
+                    total_so = total_sell_out(dff, "CHEDRAUI")
+                    st.markdown(f"<div class='kpi-card' style='height: 350px;'><div class='kpi-title'>Total Sell Out</div><div class='kpi-value' style='color:#FF6600;'>${total_so:,.2f}</div></div>", unsafe_allow_html=True)
+                with c_chart:
+                    pie_df = category_sales(dff, "CHEDRAUI")
                 
-                if not pie_df.empty:
-                    pie_df['Percent'] = (pie_df['SELL_OUT'] / total_pie) * 100
-                    domain = ["BALSAMICO", "SABROSANO", "PASTAS", "OLIVAS", "GT", "NUTRIOLI", "MI SAZON", "AVE", "REST NUTRIOLI"]
-                    range_ = ["#e012a9", "#f705ab", "#4c915d", "#97ad6a", "#7d6010", "#02c705", "#e89015", "#ff0000", "#00ff04"]
-                    base = alt.Chart(pie_df).encode(theta=alt.Theta(field="SELL_OUT", type="quantitative", stack=True)).properties(height=350)
-                    pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
-                        color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
-                        order=alt.Order("SELL_OUT", sort="descending"),
-                        tooltip=['Category', alt.Tooltip('SELL_OUT', format='$,.2f')]
-                    )
-                    text = base.mark_text(radius=130, fontSize=11).encode(
-                        text=alt.Text("label_text:N"), order=alt.Order("SELL_OUT", sort="descending"), color=alt.value("black")
-                    ).transform_calculate(label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SELL_OUT'], ',.0f')").transform_filter(alt.datum.Percent > 2.5)
-                    st.altair_chart(pie + text, use_container_width=True)
-                else: st.info("Sin datos para gráfica.")
-
-            view_mode = ""
-            if st.session_state.c_neg_zero: dff = dff[dff["DIAS_INV"] <= 0]; view_mode = "Negativos o Cero"
-            if st.session_state.c_under_10: dff = dff[dff["DIAS_INV"] < 10]; view_mode = "Menor a 10 Días"
+                    if not pie_df.empty:
+                        domain = ["BALSAMICO", "SABROSANO", "PASTAS", "OLIVAS", "GT", "NUTRIOLI", "MI SAZON", "AVE", "REST NUTRIOLI"]
+                        range_ = ["#e012a9", "#f705ab", "#4c915d", "#97ad6a", "#7d6010", "#02c705", "#e89015", "#ff0000", "#00ff04"]
+                        base = alt.Chart(pie_df).encode(theta=alt.Theta(field="SELL_OUT", type="quantitative", stack=True)).properties(height=350)
+                        pie = base.mark_arc(innerRadius=60, outerRadius=100).encode(
+                            color=alt.Color(field="Category", type="nominal", scale=alt.Scale(domain=domain, range=range_), legend=None),
+                            order=alt.Order("SELL_OUT", sort="descending"),
+                            tooltip=['Category', alt.Tooltip('SELL_OUT', format='$,.2f')]
+                        )
+                        text = base.mark_text(radius=130, fontSize=11).encode(
+                            text=alt.Text("label_text:N"), order=alt.Order("SELL_OUT", sort="descending"), color=alt.value("black")
+                        ).transform_calculate(label_text="datum.Category + ' (' + format(datum.Percent, '.0f') + '%): $' + format(datum['SELL_OUT'], ',.0f')").transform_filter(alt.datum.Percent > 2.5)
+                        st.altair_chart(pie + text, use_container_width=True)
+                    else: st.info("Sin datos para gráfica.")
+
+                view_mode = ""
+                if st.session_state.c_neg_zero: dff = dff[flag_mask(dff, "CHEDRAUI", "NEGATIVO / 0")]; view_mode = "Negativos o Cero"
+                if st.session_state.c_under_10: dff = dff[flag_mask(dff, "CHEDRAUI", "DIAS INV < 10")]; view_mode = "Menor a 10 Días"
             
-            st.caption(f"📋 Vista: {view_mode or 'Completa'}")
-            disp = dff[["NO_TIENDA", "TIENDA", "ARTICULO", "INV_ULT_SEM", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]].copy()
-            disp.columns = ['NO_TIENDA', 'TIENDA', 'ARTICULO', 'INV_ULT_SEM', 'VTA_PROM_DIARIA', 'DIAS_INV', 'SELL_OUT']
-            st.dataframe(disp.style.format({'INV_ULT_SEM': "{:,.0f}", 'VTA_PROM_DIARIA': "{:,.2f}", 'DIAS_INV': "{:,.1f}", 'SELL_OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
-
-        st.divider()
-        st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
+                st.caption(f"📋 Vista: {view_mode or 'Completa'}")
+                disp = dff[["NO_TIENDA", "TIENDA", "ARTICULO", "INV_ULT_SEM", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]].copy()
+                disp.columns = ['NO_TIENDA', 'TIENDA', 'ARTICULO', 'INV_ULT_SEM', 'VTA_PROM_DIARIA', 'DIAS_INV', 'SELL_OUT']
+                disp['SELL_OUT'] = from_cents(disp['SELL_OUT'])
+                st.dataframe(disp.style.format({'INV_ULT_SEM': "{:,.0f}", 'VTA_PROM_DIARIA': "{:,.2f}", 'DIAS_INV': "{:,.1f}", 'SELL_OUT': "${:,.2f}"}), use_container_width=True, hide_index=True)
+
+        @st.fragment
+        def panel_ranking():
+            st.markdown("<h3 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h3>", unsafe_allow_html=True)
         
-        sel_st_rank = st.selectbox("Filtrar Estado (Ranking)", ["Todos"] + sorted(df_c["ESTADO"].astype(str).unique()), key="c_rnk_st")
+            sel_st_rank = st.selectbox("Filtrar Estado (Ranking)", ["Todos"] + sorted(df_c["ESTADO"].astype(str).unique()), key="c_rnk_st")
         
-        cr1, cr2 = st.columns(2, gap="small")
-        with cr1:
-            st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
-            if st.button("📊 GENERAL", key="c_rk_gen", use_container_width=True): set_c_rank('GEN')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with cr2:
-            st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
-            if st.button("🍝 PASTAS", key="c_rk_pas", use_container_width=True): set_c_rank('PAS')
-            st.markdown('</div>', unsafe_allow_html=True)
-        cr3, cr4 = st.columns(2, gap="small")
-        with cr3:
-            st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
-            if st.button("🫒 OLIVAS", key="c_rk_oli", use_container_width=True): set_c_rank('OLI')
-            st.markdown('</div>', unsafe_allow_html=True)
-        with cr4:
-            st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
-            if st.button("🍃 NUTRIOLI", key="c_rk_nut", use_container_width=True): set_c_rank('NUT')
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        dff_rank = df_c.copy()
-        if sel_st_rank != "Todos": dff_rank = dff_rank[dff_rank["ESTADO"].astype(str) == sel_st_rank]
-
-        list_gen = ["Vinagre Oli Nutrioli Balsámico 250 ml (3795515)", "Aceite Sabrosano Mixto 850 ML (3691244)", "Aceite Mi Sazón Vegetal 800 ML (3775895)", "Pps Nutrioli Fusilli Integral (3878678)", "Aceite Ave Soya-Canola 850 ML (3696190)", "Pps Nutrioli Spaguetti 200 (3878673)", "Pps Nutrioli Fusilli Verduras (3878676)", "Pps Nutrioli Fideo 200 Gr (3878671)", "Aceite Nutrioli Antigoteo 700 ML (3738492)", "Pps Nutrioli Spaguetti Integra (3878677)", "Pps Nutrioli Codo Verduras 200 (3878675)", "Pps Nutrioli Codo 200 Gr (3878674)", "Aceite Nutrioli Protect Defensas 850 ml (3828176)", "Pps Nutrioli Fusilli 450 (3878672)", "Ace Oliva EV Oli BOT 750 Ml (3284693)", "Aceite Oliva Puro Oli Bote 750 Ml (3570620)", "Ace Oliva EV Oli BOT 500 Ml (3368446)", "Aceite Gran Tradición Soya-Canola 800 ML (3009894)", "Aceite Nutrioli Protect Mente 850 Ml (3009960)", "Aceite De Soya Nutrioli Bot 850 Ml (3132396)", "Ace Oliva Puro Oli BOT 500 Ml (3570614)", "Ace Oliva EV Oli BOT 250 Ml (3284690)", "Aceite De Soya Nutrioli Bot 400 Ml (3590824)", "Aceite Mi Sazón Mixto 400 ML", "Aceite Aerosol Nutrioli Soya Lata 180 Gr (3317342)", "Aceite Oli Extra Virgen 500 Ml (3646332)", "Aceite Aerosol Ave Mixto 170 Gr (3693814)", "Aceite de Oliva Oli Nutrioli 250 Ml (3679970)", "Aceite Nutrioli Soya 850 ML (3676715)", "Aceite Sabrosano Rinde + 850 ML (3782858)", "Aceite Aerosol Oli Oliva 145 Ml (3679971)", "Ace Oliva EV Oli BOT 500 Ml (3428657)", "Aceite Nutrioli 850+Pps Fusill (3880416)", "Aceite Nutrioli 850+Pps Codo 2 (3880415)"]
-        list_pas = ["Pps Nutrioli Fusilli Integral (3878678)", "Pps Nutrioli Spaguetti 200 (3878673)", "Pps Nutrioli Fusilli Verduras (3878676)", "Pps Nutrioli Fideo 200 Gr (3878671)", "Pps Nutrioli Spaguetti Integra (3878677)", "Pps Nutrioli Codo Verduras 200 (3878675)", "Pps Nutrioli Codo 200 Gr (3878674)", "Pps Nutrioli Fusilli 450 (3878672)", "Aceite Nutrioli 850+Pps Fusill (3880416)", "Aceite Nutrioli 850+Pps Codo 2 (3880415)"]
-        list_oli = ["Ace Oliva EV Oli BOT 750 Ml (3284693)", "Aceite Oliva Puro Oli Bote 750 Ml (3570620)", "Ace Oliva EV Oli BOT 500 Ml (3368446)", "Ace Oliva Puro Oli BOT 500 Ml (3570614)", "Ace Oliva EV Oli BOT 250 Ml (3284690)", "Aceite Oli Extra Virgen 500 Ml (3646332)", "Aceite de Oliva Oli Nutrioli 250 Ml (3679970)", "Aceite Aerosol Oli Oliva 145 Ml (3679971)", "Ace Oliva EV Oli BOT 500 Ml (3428657)"]
-        list_nut = ["Aceite De Soya Nutrioli Bot 850 Ml (3132396)"]
-
-        target_list = []
-        rank_title = ""
-        if st.session_state.c_rank_gen: target_list = list_gen; rank_title = "VENTA GENERAL ($)"
-        elif st.session_state.c_rank_pas: target_list = list_pas; rank_title = "VENTA PASTAS ($)"
-        elif st.session_state.c_rank_oli: target_list = list_oli; rank_title = "VENTA OLIVAS ($)"
-        elif st.session_state.c_rank_nut: target_list = list_nut; rank_title = "VENTA NUTRIOLI ($)"
-
-        if target_list:
-            dff_rank = dff_rank[dff_rank["ARTICULO"].isin(target_list)]
-            if not dff_rank.empty:
-                final_c_rank = dff_rank.groupby(["NO_TIENDA", "TIENDA"])['SELL_OUT'].sum().reset_index()
-                final_c_rank.columns = ['No Tienda', 'TIENDA', rank_title]
-                st.dataframe(final_c_rank.sort_values(by=rank_title, ascending=False).style.format({rank_title: "${:,.2f}"}), use_container_width=True, hide_index=True)
-            else: st.warning("⚠️ No se encontraron ventas para los productos seleccionados en este estado.")
+            cr1, cr2 = st.columns(2, gap="small")
+            with cr1:
+                st.markdown('<div class="btn-ranking-blue">', unsafe_allow_html=True)
+                if st.button("📊 GENERAL", key="c_rk_gen", use_container_width=True): set_c_rank('GEN')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with cr2:
+                st.markdown('<div class="btn-ranking-orange">', unsafe_allow_html=True)
+                if st.button("🍝 PASTAS", key="c_rk_pas", use_container_width=True): set_c_rank('PAS')
+                st.markdown('</div>', unsafe_allow_html=True)
+            cr3, cr4 = st.columns(2, gap="small")
+            with cr3:
+                st.markdown('<div class="btn-ranking-olive">', unsafe_allow_html=True)
+                if st.button("🫒 OLIVAS", key="c_rk_oli", use_container_width=True): set_c_rank('OLI')
+                st.markdown('</div>', unsafe_allow_html=True)
+            with cr4:
+                st.markdown('<div class="btn-ranking-green">', unsafe_allow_html=True)
+                if st.button("🍃 NUTRIOLI", key="c_rk_nut", use_container_width=True): set_c_rank('NUT')
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            dff_rank = df_c.copy()
+            if sel_st_rank != "Todos": dff_rank = dff_rank[dff_rank["ESTADO"].astype(str) == sel_st_rank]
+
+            rank_mode = next((m for m, k in RANK_STATE["CHEDRAUI"].items() if st.session_state[k]), None)
+            if rank_mode:
+                final_c_rank = sales_ranking(dff_rank, "CHEDRAUI", rank_mode)
+                if final_c_rank is not None:
+                    rank_title = final_c_rank.columns[-1]
+                    st.dataframe(final_c_rank.style.format({rank_title: "${:,.2f}"}), use_container_width=True, hide_index=True)
+                else: st.warning("⚠️ No se encontraron ventas para los productos seleccionados en este estado.")
+
+        panel_vista(dff, dff_base)
+        st.divider()
+        panel_ranking()
 
 def view_fresko():
     st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['FRESKO']}; color: #444;'>FRESKO</div>", unsafe_allow_html=True)
@@ -918,24 +817,139 @@ def view_fresko():
         df_fre = load_fre(f_fre)
         st.dataframe(df_fre, use_container_width=True)
 
+def view_consolidado():
+    st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['CONSOLIDADO']}'>CONSOLIDADO</div>", unsafe_allow_html=True)
+    frames = {
+        "SORIANA": get_data("SORIANA", "up_s", load_sor),
+        "WALMART": get_data("WALMART", "up_w", load_wal),
+        "CHEDRAUI": get_data("CHEDRAUI", "up_c", load_che),
+    }
+    fact = cached_fact_table(frames)
+    if fact is None: return
+
+    with st.expander("🔍 Filtros Avanzados", expanded=True):
+        c1, c2 = st.columns(2)
+        with c1: sel_ret = st.multiselect("Retailer", sorted(fact["RETAILER"].astype(str).unique()), key="con_ret")
+        with c2: sel_cat = st.multiselect("Categoría", sorted(fact["CATEGORIA_SKU"].dropna().astype(str).unique()), key="con_cat")
+    fact = apply_filters(fact, ["RETAILER", "CATEGORIA_SKU"], [sel_ret, sel_cat])
+
+    totals = fact.groupby("RETAILER", observed=True)["SELL_OUT"].sum().pipe(from_cents)
+    cols = st.columns(len(totals) + 1)
+    cols[0].markdown(f"<div class='kpi-card'><div class='kpi-title'>Total Sell Out</div><div class='kpi-value' style='color:{RETAILER_COLORS['CONSOLIDADO']};'>${totals.sum():,.2f}</div></div>", unsafe_allow_html=True)
+    for col, (retailer, val) in zip(cols[1:], totals.items()):
+        col.markdown(f"<div class='kpi-card'><div class='kpi-title'>{retailer}</div><div class='kpi-value' style='color:{RETAILER_COLORS[retailer]};'>${val:,.2f}</div></div>", unsafe_allow_html=True)
+
+    sin_maestro = fact["PRODUCTO_ID"].isna().sum()
+    if sin_maestro: st.caption(f"⚠️ {sin_maestro:,} filas sin SKU en el maestro (sku_master.csv)")
+
+    kpis = consolidated_kpis(fact)
+    if kpis.empty:
+        st.info("Sin datos para consolidar.")
+        return
+    pivot = kpis.pivot_table(index=["PRODUCTO_ID", "PRODUCTO", "CATEGORIA_SKU"], columns="RETAILER", values=["SELL_OUT", "DIAS_INV"], observed=True)
+    pivot.columns = [f"{'SELL OUT' if m == 'SELL_OUT' else 'DIAS INV'} {r}" for m, r in pivot.columns]
+    pivot = pivot.reset_index().rename(columns={"PRODUCTO_ID": "SKU", "CATEGORIA_SKU": "CATEGORIA"})
+    so_cols = [c for c in pivot.columns if c.startswith("SELL OUT")]
+    pivot["SELL OUT TOTAL"] = pivot[so_cols].sum(axis=1)
+    pivot = pivot.sort_values(by="SELL OUT TOTAL", ascending=False)
+    pivot[so_cols + ["SELL OUT TOTAL"]] = from_cents(pivot[so_cols + ["SELL OUT TOTAL"]])
+    fmt = {c: "${:,.2f}" for c in so_cols + ["SELL OUT TOTAL"]}
+    fmt.update({c: "{:,.1f}" for c in pivot.columns if c.startswith("DIAS INV")})
+    st.dataframe(pivot.style.format(fmt, na_rep="-"), use_container_width=True, hide_index=True)
+
+# --- 8. VISTA LIGERA (CELULAR) ---
+# Solo tarjetas, top-N de excepciones y top-N de rankings desde un resumen precalculado por dataset:
+# sin filtros (listas de opciones), sin gráfica Altair y sin tablas completas.
+
+def lite_cards(cards):
+    st.markdown("".join(f"<div class='kpi-card'><div class='kpi-title'>{title}</div><div class='kpi-value' style='color:{color};'>{value}</div></div>" for title, value, color in cards), unsafe_allow_html=True)
+
+@st.fragment
+def lite_exceptions(retailer, excepciones):
+    sel = st.radio("Excepciones", list(excepciones), format_func=lambda n: f"{n} ({excepciones[n][0]:,})", horizontal=True, key=f"lite_exc_{retailer}")
+    count, rows = excepciones[sel]
+    if rows.empty:
+        st.info("Sin renglones en esta excepción.")
+        return
+    st.caption(f"Top {len(rows)} de {count:,}")
+    st.dataframe(rows.style.format({c: "{:,.1f}" if c == "DIAS_INV" else "{:,.0f}" for c in rows.columns[2:]}), use_container_width=True, hide_index=True)
+
+@st.fragment
+def lite_ranking(retailer, rankings):
+    sel = st.radio("Ranking", RANKING_MODES, horizontal=True, key=f"lite_rank_{retailer}")
+    rank = rankings.get(sel)
+    if rank is None:
+        st.warning("⚠️ No se encontraron ventas para los productos seleccionados.")
+        return
+    st.dataframe(rank.style.format({rank.columns[-1]: "${:,.2f}"}), use_container_width=True, hide_index=True)
+
+def view_lite(retailer, df):
+    st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS[retailer]}'>{retailer}</div>", unsafe_allow_html=True)
+    summ = cached_summary(df, retailer, LITE_CONFIG['top_n'])
+    lite_cards([("Total Sell Out", f"${summ['sell_out']:,.2f}", RETAILER_COLORS[retailer])] +
+               [(f"DIAS INV {title}", f"{val:,.1f}", DIAS_INV_COLORS.get(title, "#444")) for title, val in summ['dias_inv'].items()])
+    if retailer in DEFAULT_FILTERS:
+        st.caption("Filtro por defecto de la vista completa: " + ", ".join(f"{c} = {', '.join(v)}" for c, v in DEFAULT_FILTERS[retailer].items()))
+
+    col = SALES_COL[retailer]
+    cat = summ['categorias'].sort_values(by=col, ascending=False)[['Category', col, 'Percent']]
+    cat.columns = ['CATEGORIA', 'SELL OUT', '%']
+    st.dataframe(cat.style.format({'SELL OUT': "${:,.2f}", '%': "{:,.1f}%"}), use_container_width=True, hide_index=True)
+
+    st.markdown("<h4 style='text-align: center; color: #444;'>⚠️ EXCEPCIONES</h4>", unsafe_allow_html=True)
+    lite_exceptions(retailer, summ['excepciones'])
+    st.markdown("<h4 style='text-align: center; color: #444;'>🏆 RANKING DE VENTAS</h4>", unsafe_allow_html=True)
+    lite_ranking(retailer, summ['rankings'])
+
+def view_lite_consolidado():
+    st.markdown(f"<div class='retailer-header' style='background-color: {RETAILER_COLORS['CONSOLIDADO']}'>CONSOLIDADO</div>", unsafe_allow_html=True)
+    totals = {}
+    for retailer, up_key, load_func in [("CHEDRAUI", "up_c", load_che), ("SORIANA", "up_s", load_sor), ("WALMART", "up_w", load_wal)]:
+        df = get_data(retailer, up_key, load_func)
+        if df is not None: totals[retailer] = cached_summary(df, retailer, LITE_CONFIG['top_n'])['sell_out_total']
+    if not totals: return
+    lite_cards([("Total Sell Out", f"${sum(totals.values()):,.2f}", RETAILER_COLORS['CONSOLIDADO'])] +
+               [(retailer, f"${val:,.2f}", RETAILER_COLORS[retailer]) for retailer, val in totals.items()])
+
 # --- 9. EJECUTAR VISTA ACTIVA ---
 if st.session_state.active_retailer == 'SORIANA':
     df_s = get_data("SORIANA", "up_s", load_sor)
-    if df_s is not None: view_soriana(df_s)
+    if df_s is not None:
+        if st.session_state.lite: view_lite("SORIANA", df_s)
+        else: view_soriana(df_s)
 
 elif st.session_state.active_retailer == 'WALMART':
     df_w = get_data("WALMART", "up_w", load_wal)
-    if df_w is not None: view_walmart(df_w)
+    if df_w is not None:
+        if st.session_state.lite: view_lite("WALMART", df_w)
+        else: view_walmart(df_w)
 
 elif st.session_state.active_retailer == 'CHEDRAUI':
     df_c = get_data("CHEDRAUI", "up_c", load_che)
-    if df_c is not None: view_chedraui(df_c)
+    if df_c is not None:
+        if st.session_state.lite: view_lite("CHEDRAUI", df_c)
+        else: view_chedraui(df_c)
 
 elif st.session_state.active_retailer == 'FRESKO':
     view_fresko()
 
+elif st.session_state.active_retailer == 'CONSOLIDADO':
+    if st.session_state.lite: view_lite_consolidado()
+    else: view_consolidado()
+
 # --- 10. PIE DE PÁGINA ---
 st.divider()
+cache_stats = get_dataset_cache().stats()
+if not st.session_state.lite:
+    with st.expander(f"💾 Memoria de datos: {cache_stats['used_mb']:,.1f} / {cache_stats['budget_mb']:,.0f} MB · {cache_stats['entries']} en memoria · {cache_stats['spilled']} en disco"):
+        st.progress(min(cache_stats['used_mb'] / cache_stats['budget_mb'], 1.0) if cache_stats['budget_mb'] else 0.0)
+        st.dataframe(cache_stats['detail'].style.format({'MB': "{:,.1f}", 'CARGA_S': "{:,.2f}"}), use_container_width=True, hide_index=True)
+        st.caption(f"Aciertos: {cache_stats['hits']:,} · Fallos: {cache_stats['misses']:,} · Expulsiones: {cache_stats['evictions']:,} · Recargas desde disco: {cache_stats['spill_loads']:,} · Volcados fallidos: {cache_stats['spill_failures']:,}")
+        store = get_shared_store()
+        if store is not None:
+            st.caption(f"Almacén compartido entre procesos: {store.root} · {cache_stats['shared_mb']:,.1f} MB mapeados (fuera del presupuesto)")
+            st.dataframe(store.status().style.format({'MB': "{:,.1f}"}), use_container_width=True, hide_index=True)
+
 if st.button("🗑️ LIMPIAR MEMORIA / RESET", use_container_width=True):
     if not st.session_state.confirm_reset:
         st.session_state.confirm_reset = True
@@ -943,6 +957,7 @@ if st.button("🗑️ LIMPIAR MEMORIA / RESET", use_container_width=True):
         st.rerun()
     else:
         st.cache_data.clear()
+        get_dataset_cache().clear()
         for key in list(st.session_state.keys()): del st.session_state[key]
         st.success("✅ Memoria limpiada. Reiniciando...")
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,276 @@
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import arrow_safe
+
+# --- 1. CONFIGURACIÓN ---
+SPILL_DIR = os.environ.get("RTL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+POLICIES = ("lru", "cost")
+# Una carga fallida (URL caída) se recuerda este tiempo para no reintentarla en cada rerun de cada sesión
+FAILURE_TTL = 60
+
+def deep_size(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    return 0
+
+# --- 2. CACHÉ DE DATASETS CON PRESUPUESTO DE MEMORIA ---
+
+class DatasetCache:
+    # policy="lru": expulsa la entrada usada hace más tiempo.
+    # policy="cost": GreedyDual-Size, prioridad = L + costo de carga / tamaño; expulsa la menor.
+    # shared=True: dataset mapeado del almacén compartido; no cuenta contra el presupuesto ni se vuelca.
+
+    def __init__(self, budget_mb=512, policy="lru", ttl=3600, spill=True, spill_dir=SPILL_DIR, failure_ttl=FAILURE_TTL):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de caché desconocida: {policy}")
+        self.budget = int(budget_mb * 2**20)
+        self.policy = policy
+        self.ttl = ttl
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.failure_ttl = failure_ttl
+        self.entries = {}
+        self.spilled = {}
+        self.failures = {}
+        self.inflation = 0.0
+        self.hits = self.misses = self.evictions = self.spill_loads = self.spill_failures = 0
+        self.lock = threading.RLock()
+        self.key_locks = {}
+
+    # -- acceso --
+
+    def get_or_load(self, key, loader, shared=False):
+        value = self._lookup(key)
+        if value is None:
+            with self._key_lock(key):
+                # Otra sesión pudo cargarlo mientras se esperaba el candado
+                value = self._lookup(key)
+                if value is None:
+                    value = self._load_spilled(key)
+                if value is None:
+                    if self.failed_recently(key):
+                        return None
+                    with self.lock:
+                        self.misses += 1
+                    t0 = time.perf_counter()
+                    value = loader()
+                    if value is None:
+                        self.mark_failed(key)
+                    else:
+                        self.put(key, value, time.perf_counter() - t0, shared=shared)
+                    return value
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def get(self, key):
+        value = self._lookup(key)
+        if value is None:
+            with self._key_lock(key):
+                value = self._lookup(key)
+                if value is None:
+                    value = self._load_spilled(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self.entries[key]
+                entry = None
+            if entry is not None:
+                self._touch(entry)
+                return entry["value"]
+            return None
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def failed_recently(self, key):
+        with self.lock:
+            failed = self.failures.get(key)
+            if failed is not None and time.time() - failed > self.failure_ttl:
+                del self.failures[key]
+                failed = None
+            return failed is not None
+
+    def mark_failed(self, key):
+        with self.lock:
+            self.failures[key] = time.time()
+
+    def put(self, key, value, cost=0.0, created=None, shared=False):
+        size = deep_size(value)
+        with self.lock:
+            self.entries.pop(key, None)
+            self.failures.pop(key, None)
+            self._drop_spilled(key)
+            entry = {"value": value, "size": size, "cost": max(cost, 1e-3), "created": created or time.time(), "hits": 0, "shared": shared}
+            self._touch(entry)
+            self.entries[key] = entry
+            self._enforce_budget(keep=key)
+
+    def discard(self, prefix, keep=None):
+        # Quita las entradas de versiones anteriores de un dataset (p.ej. "load_che:url@")
+        with self.lock:
+            for key in [k for k in self.entries if k.startswith(prefix) and k != keep]:
+                del self.entries[key]
+            for key in [k for k in self.spilled if k.startswith(prefix) and k != keep]:
+                self._drop_spilled(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.failures.clear()
+            for key in list(self.spilled):
+                self._drop_spilled(key)
+            self.inflation = 0.0
+
+    # -- estadísticas --
+
+    def used_bytes(self):
+        with self.lock:
+            return sum(e["size"] for e in self.entries.values() if not e["shared"])
+
+    def shared_bytes(self):
+        with self.lock:
+            return sum(e["size"] for e in self.entries.values() if e["shared"])
+
+    def stats(self):
+        with self.lock:
+            rows = [{"DATASET": k, "MB": e["size"] / 2**20, "CARGA_S": e["cost"], "HITS": e["hits"], "EN_DISCO": False, "COMPARTIDO": e["shared"]} for k, e in self.entries.items()]
+            rows += [{"DATASET": k, "MB": s["size"] / 2**20, "CARGA_S": s["cost"], "HITS": 0, "EN_DISCO": True, "COMPARTIDO": False} for k, s in self.spilled.items()]
+            return {
+                "used_mb": self.used_bytes() / 2**20,
+                "shared_mb": self.shared_bytes() / 2**20,
+                "budget_mb": self.budget / 2**20,
+                "entries": len(self.entries),
+                "spilled": len(self.spilled),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spill_loads": self.spill_loads,
+                "spill_failures": self.spill_failures,
+                "detail": pd.DataFrame(rows, columns=["DATASET", "MB", "CARGA_S", "HITS", "EN_DISCO", "COMPARTIDO"]),
+            }
+
+    # -- internos --
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.time() - entry["created"] > self.ttl
+
+    def _touch(self, entry):
+        entry["hits"] += 1
+        entry["last"] = time.monotonic()
+        entry["priority"] = self.inflation + entry["cost"] / max(entry["size"], 1)
+
+    def _victim(self, keep):
+        # Expulsar un dataset compartido no libera memoria del proceso: solo compiten los privados
+        candidates = [(k, e) for k, e in self.entries.items() if k != keep and not e["shared"]]
+        if not candidates:
+            return None
+        field = "last" if self.policy == "lru" else "priority"
+        return min(candidates, key=lambda kv: kv[1][field])[0]
+
+    def _enforce_budget(self, keep):
+        while self.used_bytes() > self.budget:
+            key = self._victim(keep)
+            if key is None:
+                break
+            entry = self.entries.pop(key)
+            if self.policy == "cost":
+                self.inflation = entry["priority"]
+            self.evictions += 1
+            if self.spill:
+                self._spill(key, entry)
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, hashlib.md5(key.encode()).hexdigest() + ".parquet")
+
+    def _spill(self, key, entry):
+        value = entry["value"]
+        if not isinstance(value, pd.DataFrame):
+            return
+        path = self._spill_path(key)
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            # Columnas mixtas (números y texto) se guardan como texto; al recargar se restauran los dtypes
+            arrow_safe(value).to_parquet(path)
+        except Exception:
+            # Encabezados no texto u otros tipos que Parquet no acepta: el dataset se descarta y se reporta
+            self.spill_failures += 1
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        self.spilled[key] = {"path": path, "size": entry["size"], "cost": entry["cost"], "created": entry["created"], "dtypes": value.dtypes}
+
+    def _load_spilled(self, key):
+        # Se llama con el candado de la llave, no con el global: leer el Parquet no bloquea a las demás llaves
+        with self.lock:
+            meta = self.spilled.get(key)
+            if meta is None:
+                return None
+            if self.ttl is not None and time.time() - meta["created"] > self.ttl:
+                self._drop_spilled(key)
+                return None
+        try:
+            value = pd.read_parquet(meta["path"])
+            # Parquet no siempre conserva categóricas de enteros; se restauran los dtypes originales
+            changed = {c: t for c, t in meta["dtypes"].items() if c in value.columns and value[c].dtype != t}
+            if changed:
+                value = value.astype(changed)
+            # Los nulos de columnas de texto regresan como None; se dejan como NaN igual que al leer el Excel
+            for c in value.columns[value.dtypes == object]:
+                value[c] = value[c].where(value[c].notna(), np.nan)
+        except Exception:
+            with self.lock:
+                if self.spilled.get(key) is meta:
+                    self._drop_spilled(key)
+            return None
+        with self.lock:
+            # clear() o un put() pudieron soltar el archivo mientras se leía
+            if self.spilled.get(key) is not meta:
+                return None
+            self.spill_loads += 1
+            self.put(key, value, meta["cost"], meta["created"])
+        return value
+
+    def _drop_spilled(self, key):
+        meta = self.spilled.pop(key, None)
+        if meta is not None and os.path.exists(meta["path"]):
+            os.remove(meta["path"])
+
+# --- 3. INSTANCIA COMPARTIDA POR PROCESO ---
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+def shared_cache(**config):
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = DatasetCache(**config)
+        return _SHARED
+
+def current_cache():
+    return _SHARED
+
+def source_key(source):
+    if isinstance(source, str):
+        return source
+    data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return f"{getattr(source, 'name', 'archivo')}:{hashlib.md5(data).hexdigest()}"
@@ -0,0 +1,123 @@
+import os
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- 1. CONFIGURACIÓN ---
+SKU_MASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sku_master.csv")
+
+# Columnas de cada retailer que alimentan la tabla de hechos unificada ("so" ya viene en centavos)
+FACT_SOURCES = {
+    "SORIANA": {"desc": "DESCRIPCION", "no_tienda": "NO_TIENDA", "inv": "INV_CAJAS", "so": "SO_$"},
+    "WALMART": {"desc": "DESCRIPCION", "no_tienda": None, "inv": "EXISTENCIA", "so": "SO_$"},
+    "CHEDRAUI": {"desc": "ARTICULO", "no_tienda": "NO_TIENDA", "inv": "INV_ULT_SEM", "so": "SELL_OUT"},
+}
+MONEY_SCALE = 100
+FACT_CATEGORICALS = ["RETAILER", "PRODUCTO_ID", "PRODUCTO", "CATEGORIA_SKU", "NO_TIENDA", "TIENDA", "ESTADO", "DESC_NORM"]
+
+# --- 2. COLUMNAS NUMÉRICAS COMPACTAS ---
+
+def to_cents(values):
+    # Dinero como centavos enteros: sumas exactas; int32 mientras quepa, si no int64
+    cents = np.rint(pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(dtype="float64") * MONEY_SCALE)
+    dtype = "int32" if not len(cents) or np.abs(cents).max() < 2**31 else "int64"
+    return pd.Series(cents.astype(dtype), index=values.index, name=values.name)
+
+def from_cents(cents):
+    return cents / MONEY_SCALE
+
+def compact_quantity(values):
+    # Piezas/cajas enteras al entero más chico que las contenga; si hay fracciones queda en float32
+    values = pd.to_numeric(values, errors="coerce").fillna(0)
+    if (np.mod(values.to_numpy(dtype="float64"), 1) == 0).all():
+        return pd.to_numeric(values, downcast="integer")
+    return values.astype("float32")
+
+def arrow_safe(df):
+    # Columnas object con tipos mezclados (p.ej. ESTADO con números y texto) se pasan a texto para poder
+    # guardarlas en formato columnar (Arrow / Parquet); los nulos se conservan
+    df = df.copy(deep=False)
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+# --- 3. NORMALIZACIÓN DE DESCRIPCIONES ---
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKD", str(text).upper().replace("&NBSP;", " "))
+    text = text.encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.split())
+
+def text_key(text):
+    return normalize_text(text).replace(" ", "")
+
+def add_desc_columns(df, desc_col):
+    # Se normaliza cada descripción distinta una sola vez y se expande por código
+    codes, uniques = pd.factorize(df[desc_col].astype(str))
+    norm = pd.Index([normalize_text(u) for u in uniques])
+    keys = pd.Index([n.replace(" ", "") for n in norm])
+    df["DESC_NORM"] = pd.Categorical(norm[codes])
+    df["DESC_KEY"] = pd.Categorical(keys[codes])
+    return df
+
+# --- 4. MAESTRO DE SKUS ---
+
+@lru_cache(maxsize=1)
+def load_sku_master(path=SKU_MASTER_PATH):
+    master = pd.read_csv(path, dtype=str).fillna("")
+    master["DESC_KEY"] = master["DESCRIPCION"].map(text_key)
+    return master.drop_duplicates(subset=["RETAILER", "DESC_KEY"])
+
+def attach_sku(df, retailer, desc_col):
+    df = add_desc_columns(df, desc_col)
+    master = load_sku_master()
+    lookup = master[master["RETAILER"] == retailer].set_index("DESC_KEY")
+    keys = df["DESC_KEY"].astype(str)
+    df["PRODUCTO_ID"] = keys.map(lookup["PRODUCTO_ID"]).astype("category")
+    df["PRODUCTO"] = keys.map(lookup["PRODUCTO"]).astype("category")
+    df["CATEGORIA_SKU"] = keys.map(lookup["CATEGORIA"]).astype("category")
+    return df
+
+# --- 5. TABLA DE HECHOS UNIFICADA ---
+
+def to_fact(df, retailer):
+    src = FACT_SOURCES[retailer]
+    if "DESC_KEY" not in df.columns:
+        df = attach_sku(df.copy(), retailer, src["desc"])
+    fact = pd.DataFrame({
+        "RETAILER": retailer,
+        "PRODUCTO_ID": df["PRODUCTO_ID"].astype(object),
+        "PRODUCTO": df["PRODUCTO"].astype(object),
+        "CATEGORIA_SKU": df["CATEGORIA_SKU"].astype(object),
+        "NO_TIENDA": df[src["no_tienda"]].astype(str) if src["no_tienda"] else "",
+        "TIENDA": df["TIENDA"].astype(str),
+        "ESTADO": df["ESTADO"].astype(str),
+        "DESC_NORM": df["DESC_NORM"].astype(object),
+        "INVENTARIO": pd.to_numeric(df[src["inv"]], errors="coerce").fillna(0).astype("float32"),
+        "SELL_OUT": df[src["so"]].astype("int64"),
+        "DIAS_INV": pd.to_numeric(df["DIAS_INV"], errors="coerce").fillna(0).astype("float32"),
+    })
+    return fact.reset_index(drop=True)
+
+def build_fact_table(frames):
+    parts = [to_fact(df, retailer) for retailer, df in frames.items() if df is not None]
+    if not parts:
+        return None
+    fact = pd.concat(parts, ignore_index=True)
+    for col in FACT_CATEGORICALS:
+        fact[col] = fact[col].astype("category")
+    return fact
+
+def consolidated_kpis(fact):
+    return fact.groupby(["PRODUCTO_ID", "PRODUCTO", "CATEGORIA_SKU", "RETAILER"], observed=True).agg(
+        SELL_OUT=("SELL_OUT", "sum"),
+        INVENTARIO=("INVENTARIO", "sum"),
+        DIAS_INV=("DIAS_INV", "mean"),
+        TIENDAS=("TIENDA", "nunique"),
+    ).reset_index()
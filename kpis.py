@@ -0,0 +1,275 @@
+import itertools
+import threading
+import weakref
+
+import pandas as pd
+
+from alerts import EXCEPTIONS, flag_mask, exception_set, store_counts
+from ingest import text_key, from_cents, build_fact_table
+
+# --- 1. CONFIGURACIÓN ---
+SALES_COL = {"SORIANA": "SO_$", "WALMART": "SO_$", "CHEDRAUI": "SELL_OUT"}
+DESC_COL = {"SORIANA": "DESCRIPCION", "WALMART": "DESCRIPCION", "CHEDRAUI": "ARTICULO"}
+EXCLUDED_FORMATS = {"WALMART": ['BAE', 'MB']}
+
+# Columnas filtrables por retailer (mismas que los filtros de cada vista)
+FILTER_COLS = {
+    "SORIANA": ["RESURTIMIENTO", "NO_TIENDA", "TIENDA", "CATEGORIA", "CIUDAD", "ESTADO", "FORMATO", "DESCRIPCION"],
+    "WALMART": ["MARCA", "ESTADO", "TIENDA", "FORMATO", "DESCRIPCION"],
+    "CHEDRAUI": ["NO_TIENDA", "TIENDA", "ESTADO", "CATEGORIA", "ARTICULO"],
+}
+
+# Tarjetas DIAS INV: (título, patrón de descripción); Walmart y Chedraui las calculan sin el filtro de artículo
+DIAS_INV_CARDS = {
+    "SORIANA": [("NUTRIOLI 850ML", "ACEITE DE SOYA NUTRIOLI BOT 850 ML"), ("SABROSANO 850ML", "ACEITE COMESTIBLE SABROSANO 850 ML"), ("PASTAS", None)],
+    "WALMART": [("NUTRIOLI 946M", "NUTRIOLI ACEITE PURO DE SOYA 946 ML"), ("SABROSANO 850ML", "SABROSANO ACEITE 850ML MANTEQUILLA"),
+                ("AVE 850ML", "ACEITE AVE 850ML"), ("GRAN TRADICION", "ACEITE COMESTIBLE GRAN TRADICION 850ML")],
+    "CHEDRAUI": [("NUTRIOLI 850ML", "Nutrioli Bot 850"), ("SABROSANO 850ML", "Sabrosano Mixto 850"), ("AVE 850ML", "Ave Soya-Canola 850")],
+}
+DIAS_INV_IGNORES_ARTICLE = {"SORIANA": False, "WALMART": True, "CHEDRAUI": True}
+
+# Selección con la que abre cada vista completa si el valor existe (Soriana: solo artículos resurtibles)
+DEFAULT_FILTERS = {"SORIANA": {"RESURTIMIENTO": ["1.0"]}}
+
+# Resumen ligero (móvil): renglones por ranking y por excepción, y columnas que se muestran de cada excepción
+SUMMARY_TOP_N = 10
+EXCEPTION_COLS = {
+    "SORIANA": ["TIENDA", "DESCRIPCION", "INV_CAJAS", "DIAS_INV"],
+    "WALMART": ["TIENDA", "DESCRIPCION", "EXISTENCIA", "DIAS_INV"],
+    "CHEDRAUI": ["TIENDA", "ARTICULO", "INV_ULT_SEM", "DIAS_INV"],
+}
+
+# --- 2. CATEGORÍAS DE LA GRÁFICA DE PASTEL ---
+BORGES_LIST = [
+    "BORGES ACEITE OLIVA EXTRA VIRGEN 500", "BORGES ACEITE OLIVA EXTRA SUAVE", 
+    "ACEITE DE OLIVA EXTRA VIRGEN KOSHER", "ACEITE DE OLIVA A LA ALBAHACA FRESCA", 
+    "ACEITE DE SOJA JENGIBRE", "ACEITE DE OLIVA AL AJO FRITO", 
+    "ACEITE DE OLIVA AL  ROMERO FRESCO", "BORGES ACEITE DE PEPITA UVA 500ML", 
+    "BORGES ACEITE DE OLIVA EXTRA VIRGEN ECOL", "BORGES VINAGRE BALSAMICO 250ML", 
+    "VINAGRE DE JEREZ 250 ML", "VINAGRE DE SIDRA 250 ML", "VINAGRE DE VINO FRAMBUESA", 
+    "VINAGRE DE VINO AL  AJO 250 ML", "BORGES VINAGRE VINO BLANCO", 
+    "VINAGRE DE MANZANA ECOLOGICO", "BORGES VINAGRE DE VINOTINTO", 
+    "VINAGRE DE VINO DE RIOJA BOTELLA 250ML", "BORGES ACEITE OLIVA 100 PURO CON AJO"
+]
+BORGES_CLEAN = [x.replace(" ", "").upper() for x in BORGES_LIST]
+
+def get_soriana_category(desc):
+    desc = str(desc).upper().replace(" ", "")
+    if "SABROSANO" in desc: return "SABROSANO"
+    if "GRANTRADICION" in desc: return "GT"
+    if "BALSAMICO" in desc: return "BALSAMICO"
+    if "MISAZON" in desc or "MISAZÓN" in desc: return "MI SAZON"
+    if "AVE" in desc: return "AVE"
+    if "NUTRIOLI" in desc and any(k in desc for k in ["FUSILLI", "SPAGUETTI", "FIDEO", "CODO", "PASTA"]): return "PASTAS"
+    if "OLI" in desc and ("OLIVA" in desc or "EV" in desc or "AEROSOL" in desc or "ADEREZO" in desc): return "OLIVAS"
+    if "NUTRIOLI" in desc and ("400ML" in desc or "850ML" in desc) and "PROTECT" not in desc and "DEFENSAS" not in desc: return "NUTRIOLI"
+    if "NUTRIOLI" in desc: return "REST NUTRIOLI"
+    return None
+
+def get_walmart_category(desc):
+    desc_clean = str(desc).upper().replace(" ", "").replace("&NBSP;", "")
+
+    if any(b in desc_clean for b in BORGES_CLEAN): return "BORGES"
+
+    if "NUTRIOLI" in desc_clean and "946" in desc_clean: return "NUTRIOLI"
+
+    if "SABROSANO" in desc_clean: return "SABROSANO"
+    if "GRANTRADICION" in desc_clean: return "GT"
+    if "BALSAMICO" in desc_clean: return "BALSAMICO"
+    if any(k in desc_clean for k in ["OLISPRAY", "OLICOCINA", "OLIDENUTEV", "ACEITEOLIDEOLIVA", "OLIDENUT"]) and "BALSAMICO" not in desc_clean: return "OLIVAS"
+    if "NUTRIOLI" in desc_clean and any(x in desc_clean for x in ["SPAGUETTI", "FIDEO", "CODO", "PASTA"]): return "PASTAS"
+    if "NUTRIOLI" in desc_clean: return "REST NUTRIOLI"
+    return None
+
+def get_chedraui_category(desc):
+    desc = str(desc).upper().replace(" ", "")
+    if "BALSAMICO" in desc: return "BALSAMICO"
+    if "SABROSANO" in desc: return "SABROSANO"
+    if "GRANTRADICION" in desc: return "GT"
+    if "MISAZON" in desc or "MISAZÓN" in desc: return "MI SAZON"
+    if "AVE" in desc and ("SOYA-CANOLA" in desc or "AEROSOL" in desc): return "AVE"
+    if "NUTRIOLI" in desc and any(k in desc for k in ["FUSILLI", "SPAGUETTI", "FIDEO", "CODO"]): return "PASTAS"
+    if "OLI" in desc and ("OLIVA" in desc or "EV" in desc or "AEROSOL" in desc): return "OLIVAS"
+    if "NUTRIOLI" in desc and ("400ML" in desc or "850ML" in desc) and "PROTECT" not in desc and "DEFENSAS" not in desc: return "NUTRIOLI"
+    if "NUTRIOLI" in desc: return "REST NUTRIOLI"
+    return None
+
+CATEGORY_FUNCS = {"SORIANA": get_soriana_category, "WALMART": get_walmart_category, "CHEDRAUI": get_chedraui_category}
+
+# --- 3. LISTAS DE RANKING ---
+RANKING_MODES = ["GENERAL", "PASTAS", "OLIVAS", "NUTRIOLI"]
+
+list_s_gen = [
+    "ACEITE COMESTIBLE NUTRIOLI ANTIGOTEO 700", "ACEITE COMESTIBLE GRAN TRADICION 900 ML", "ACEITE COMESTIBLE SABROSANO +30 850 ML", 
+    "ACEITE OLIVA OLI PURO SPRAY 145 ML", "JUSTO 850 ML", "ACEITE COMESTIBLE AEROSOL 170GR", "ACEITE COMESTIBLE AVE 850 ML", 
+    "ACEITE COMESTIBLE NUTRIOLI 400 ML", "ACEITE COMESTIBLE NUTRIOLI AEROSOL 180ML", "ACEITE COMESTIBLE NUTRIOLI DHA 850 ML", 
+    "ACEITE COMESTIBLE SABROSANO 850 ML", "SABROSANO RINDE+ 850 ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", 
+    "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", "ADERE OLI OLIVA PARA COCINAR 500 ML OLI", 
+    "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ", "ADEREZO OLI 500 ML BOT", "ACEITE COMESTIBLE GRAN TRADICION 800 ML", 
+    "ACEITE DE SOYA NUTRIOLI BOT 850 ML", "VINAGRE BALSAMICO 250ML", "ACEITE NUTRIOLI PROTECT DEFENSAS 850ML", 
+    "ACEITE NUTRIOLI PROTECT MENTE 850 ML", "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR", 
+    "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", "PASTA CODO NUTRIOLI VERDURAS 200GR", "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", 
+    "PASTA SPAGHETTI NUTRIOLI 200GR", "PASTA CODO NUTRIOLI 200GR"
+]
+list_s_pas = [
+    "PASTA FIDEO NUTRIOLI 200GR", "PASTA SPAGHETTI NUTRIOLI INTEGRAL 200GR", "PASTA FUSILLI INTEGRAL NUTRIOLI 200GR", 
+    "PASTA CODO NUTRIOLI VERDURAS 200GR", "PASTA FUSILLI VERDURAS NUTRIOLI 450GR", "PASTA SPAGHETTI NUTRIOLI 200GR", 
+    "PASTA CODO NUTRIOLI 200GR"
+]
+list_s_oli = [
+    "ACEITE OLI OLIVA EXTRA VIRGEN PZ 250ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 500ML", "ACEITE OLI OLIVA EXTRA VIRGEN PZ 750ML", 
+    "ADERE OLI OLIVA PARA COCINAR 500 ML OLI", "ADERE OLI OLIVA PARA COCINAR 750 ML OLI", "ADEREZO OLI 250 ML PZ", 
+    "ADEREZO OLI 500 ML BOT", "ACEITE OLIVA OLI PURO SPRAY 145 ML"
+]
+list_s_nut = ["ACEITE DE SOYA NUTRIOLI BOT 850 ML"]
+
+list_c_gen = ["Vinagre Oli Nutrioli Balsámico 250 ml (3795515)", "Aceite Sabrosano Mixto 850 ML (3691244)", "Aceite Mi Sazón Vegetal 800 ML (3775895)", "Pps Nutrioli Fusilli Integral (3878678)", "Aceite Ave Soya-Canola 850 ML (3696190)", "Pps Nutrioli Spaguetti 200 (3878673)", "Pps Nutrioli Fusilli Verduras (3878676)", "Pps Nutrioli Fideo 200 Gr (3878671)", "Aceite Nutrioli Antigoteo 700 ML (3738492)", "Pps Nutrioli Spaguetti Integra (3878677)", "Pps Nutrioli Codo Verduras 200 (3878675)", "Pps Nutrioli Codo 200 Gr (3878674)", "Aceite Nutrioli Protect Defensas 850 ml (3828176)", "Pps Nutrioli Fusilli 450 (3878672)", "Ace Oliva EV Oli BOT 750 Ml (3284693)", "Aceite Oliva Puro Oli Bote 750 Ml (3570620)", "Ace Oliva EV Oli BOT 500 Ml (3368446)", "Aceite Gran Tradición Soya-Canola 800 ML (3009894)", "Aceite Nutrioli Protect Mente 850 Ml (3009960)", "Aceite De Soya Nutrioli Bot 850 Ml (3132396)", "Ace Oliva Puro Oli BOT 500 Ml (3570614)", "Ace Oliva EV Oli BOT 250 Ml (3284690)", "Aceite De Soya Nutrioli Bot 400 Ml (3590824)", "Aceite Mi Sazón Mixto 400 ML", "Aceite Aerosol Nutrioli Soya Lata 180 Gr (3317342)", "Aceite Oli Extra Virgen 500 Ml (3646332)", "Aceite Aerosol Ave Mixto 170 Gr (3693814)", "Aceite de Oliva Oli Nutrioli 250 Ml (3679970)", "Aceite Nutrioli Soya 850 ML (3676715)", "Aceite Sabrosano Rinde + 850 ML (3782858)", "Aceite Aerosol Oli Oliva 145 Ml (3679971)", "Ace Oliva EV Oli BOT 500 Ml (3428657)", "Aceite Nutrioli 850+Pps Fusill (3880416)", "Aceite Nutrioli 850+Pps Codo 2 (3880415)"]
+list_c_pas = ["Pps Nutrioli Fusilli Integral (3878678)", "Pps Nutrioli Spaguetti 200 (3878673)", "Pps Nutrioli Fusilli Verduras (3878676)", "Pps Nutrioli Fideo 200 Gr (3878671)", "Pps Nutrioli Spaguetti Integra (3878677)", "Pps Nutrioli Codo Verduras 200 (3878675)", "Pps Nutrioli Codo 200 Gr (3878674)", "Pps Nutrioli Fusilli 450 (3878672)", "Aceite Nutrioli 850+Pps Fusill (3880416)", "Aceite Nutrioli 850+Pps Codo 2 (3880415)"]
+list_c_oli = ["Ace Oliva EV Oli BOT 750 Ml (3284693)", "Aceite Oliva Puro Oli Bote 750 Ml (3570620)", "Ace Oliva EV Oli BOT 500 Ml (3368446)", "Ace Oliva Puro Oli BOT 500 Ml (3570614)", "Ace Oliva EV Oli BOT 250 Ml (3284690)", "Aceite Oli Extra Virgen 500 Ml (3646332)", "Aceite de Oliva Oli Nutrioli 250 Ml (3679970)", "Aceite Aerosol Oli Oliva 145 Ml (3679971)", "Ace Oliva EV Oli BOT 500 Ml (3428657)"]
+list_c_nut = ["Aceite De Soya Nutrioli Bot 850 Ml (3132396)"]
+
+RANKING_LISTS = {
+    "SORIANA": {"GENERAL": list_s_gen, "PASTAS": list_s_pas, "OLIVAS": list_s_oli, "NUTRIOLI": list_s_nut},
+    "CHEDRAUI": {"GENERAL": list_c_gen, "PASTAS": list_c_pas, "OLIVAS": list_c_oli, "NUTRIOLI": list_c_nut},
+}
+# Walmart filtra por texto en lugar de lista: (columna, patrón); NUTRIOLI es top 10
+WALMART_RANKING_MATCH = {"PASTAS": ("CATEGORIA", "PASTAS"), "OLIVAS": ("DESCRIPCION", "OLI"), "NUTRIOLI": ("DESCRIPCION", "NUTRIOLI 946M")}
+RANKING_TITLES = {
+    "GENERAL": "VENTA GENERAL ($)", "PASTAS": "VENTA PASTAS ($)", "OLIVAS": "VENTA OLIVAS ($)", "NUTRIOLI": "VENTA NUTRIOLI ($)",
+}
+
+# --- 4. CÁLCULOS ---
+
+def safe_mean(series):
+    return series.mean() if not series.empty else 0
+
+def apply_filters(df, filter_cols, selections):
+    mask = pd.Series(True, index=df.index)
+    for col, sel in zip(filter_cols, selections):
+        if sel:
+            mask &= df[col].astype(str).isin(sel)
+    return df[mask]
+
+def default_frame(df, retailer):
+    for col, values in DEFAULT_FILTERS.get(retailer, {}).items():
+        mask = df[col].astype(str).isin(values)
+        if mask.any():
+            df = df[mask]
+    return df
+
+def get_kpi_mean(df, desc_col, days_col, pattern):
+    if "DESC_KEY" in df.columns:
+        clean_desc = df["DESC_KEY"].astype(str)
+    else:
+        clean_desc = df[desc_col].astype(str).map(text_key)
+    mask = clean_desc.str.contains(text_key(pattern), regex=False, na=False)
+    return safe_mean(df.loc[mask, days_col])
+
+def base_frame(df, retailer):
+    excluded = EXCLUDED_FORMATS.get(retailer)
+    return df[~df["FORMATO"].isin(excluded)] if excluded else df
+
+def total_sell_out(df, retailer):
+    return from_cents(df[SALES_COL[retailer]].sum())
+
+def dias_inv_kpis(df, retailer):
+    desc_col = DESC_COL[retailer]
+    values = {}
+    for title, pattern in DIAS_INV_CARDS[retailer]:
+        if pattern is None:
+            mask = df[desc_col].astype(str).str.contains("PASTA", case=False, na=False)
+            values[title] = df.loc[mask, "DIAS_INV"].mean() if mask.any() else 0
+        else:
+            values[title] = get_kpi_mean(df, desc_col, "DIAS_INV", pattern)
+    return values
+
+def category_sales(df, retailer):
+    col = SALES_COL[retailer]
+    category = df["DESC_KEY"].map(CATEGORY_FUNCS[retailer]).astype(object)
+    pie_df = df[col].groupby(category.rename("Category")).sum().pipe(from_cents).reset_index()
+    pie_df = pie_df[pie_df[col] > 0]
+    pie_df["Percent"] = (pie_df[col] / pie_df[col].sum()) * 100
+    return pie_df.reset_index(drop=True)
+
+def sales_ranking(df, retailer, mode):
+    col, title = SALES_COL[retailer], RANKING_TITLES[mode]
+    if retailer == "WALMART":
+        if mode == "GENERAL":
+            title = "VENTA TOTAL ($)"
+        else:
+            match_col, pattern = WALMART_RANKING_MATCH[mode]
+            df = df[df[match_col].str.contains(pattern, case=False, na=False)]
+        keys = ["TIENDA"]
+    else:
+        df = df[df["DESC_KEY"].isin([text_key(t) for t in RANKING_LISTS[retailer][mode]])]
+        keys = ["NO_TIENDA", "TIENDA"]
+    if df.empty:
+        return None
+    rank = df.groupby(keys, observed=True)[col].sum().pipe(from_cents).reset_index()
+    rank.columns = (["No Tienda"] if len(keys) == 2 else []) + ["TIENDA", title]
+    rank = rank.sort_values(by=title, ascending=False)
+    return rank.head(10) if retailer == "WALMART" and mode == "NUTRIOLI" else rank
+
+# --- 5. RESUMEN PRECALCULADO ---
+
+def top_exceptions(df, retailer, name, top_n=SUMMARY_TOP_N):
+    # Peores primero según la columna de severidad de la excepción
+    _, value_col, worse = EXCEPTIONS[retailer][name]
+    rows = df.loc[flag_mask(df, retailer, name), EXCEPTION_COLS[retailer]]
+    rows = rows.sort_values(by=value_col, ascending=worse < 0).head(top_n).reset_index(drop=True)
+    for c in rows.columns[rows.dtypes == object]:
+        rows[c] = rows[c].astype(str)
+    return rows
+
+def retailer_summary(df, retailer, top_n=SUMMARY_TOP_N):
+    # Mismos números que la vista completa al abrir: sin formatos excluidos y con los filtros por defecto.
+    # "sell_out_total" es el total sin filtros por defecto, el que suma el consolidado
+    df = base_frame(df, retailer)
+    sell_out_total = total_sell_out(df, retailer)
+    df = default_frame(df, retailer)
+    rankings = {mode: sales_ranking(df, retailer, mode) for mode in RANKING_MODES}
+    return {
+        "renglones": len(df),
+        "sell_out": total_sell_out(df, retailer),
+        "sell_out_total": sell_out_total,
+        "dias_inv": dias_inv_kpis(df, retailer),
+        "categorias": category_sales(df, retailer),
+        "excepciones": {name: (int(flag_mask(df, retailer, name).sum()), top_exceptions(df, retailer, name, top_n)) for name in EXCEPTIONS[retailer]},
+        "rankings": {mode: rank.head(top_n).reset_index(drop=True) for mode, rank in rankings.items() if rank is not None},
+    }
+
+_MEMO = {}
+_MEMO_LOCK = threading.Lock()
+
+def _memoized(key, datasets, compute):
+    # Un resultado por objeto dataset: mientras la caché de datasets devuelva los mismos DataFrames no se recalcula,
+    # y al recargarse (TTL, versión nueva del almacén compartido) las referencias débiles dejan de coincidir
+    with _MEMO_LOCK:
+        entry = _MEMO.get(key)
+    if entry is not None and all(ref() is df for ref, df in zip(entry[0], datasets)):
+        return entry[1]
+    value = compute()
+    with _MEMO_LOCK:
+        for k in [k for k, (refs, _) in _MEMO.items() if any(ref() is None for ref in refs)]:
+            del _MEMO[k]
+        _MEMO[key] = ([weakref.ref(df) for df in datasets], value)
+    return value
+
+_TOKENS = itertools.count(1)
+
+def dataset_token(df):
+    # Entero único por objeto dataset: llave barata para st.cache_data en lugar de hashear el DataFrame
+    return _memoized(("token", id(df)), [df], lambda: next(_TOKENS))
+
+def cached_summary(df, retailer, top_n=SUMMARY_TOP_N):
+    return _memoized(("resumen", retailer, id(df), top_n), [df], lambda: retailer_summary(df, retailer, top_n))
+
+def cached_store_counts(df, retailer):
+    # Excepciones por tienda a partir de las banderas del dataset cargado: también para archivos subidos
+    return _memoized(("conteos", retailer, id(df)), [df], lambda: store_counts(exception_set(base_frame(df, retailer), retailer), retailer))
+
+def cached_fact_table(frames):
+    # Tabla de hechos del consolidado, ya sin los formatos excluidos de cada retailer
+    frames = {r: df for r, df in frames.items() if df is not None}
+    key = ("hechos",) + tuple((r, id(df)) for r, df in frames.items())
+    return _memoized(key, list(frames.values()), lambda: build_fact_table({r: base_frame(df, r) for r, df in frames.items()}))
@@ -0,0 +1,212 @@
+import functools
+import os
+from io import BytesIO
+
+import pandas as pd
+import requests
+
+from alerts import update_alerts, add_exception_flags, WAL_4SEM_COLS
+from dataset_cache import shared_cache, source_key
+from ingest import attach_sku, to_cents, compact_quantity
+from kpis import base_frame
+from shared_store import shared_store
+
+# --- 1. CONFIGURACIÓN ---
+DATASET_TTL = 3600
+# Datasets grandes: presupuesto en MB, política 'lru' o 'cost' y volcado a Parquet local al expulsar
+DATASET_CACHE_CONFIG = {
+    'budget_mb': float(os.environ.get("RTL_CACHE_BUDGET_MB", 512)),
+    'policy': os.environ.get("RTL_CACHE_POLICY", "lru"),
+    'ttl': DATASET_TTL,
+    'spill': os.environ.get("RTL_CACHE_SPILL", "1") == "1",
+}
+# URLs de Datos (RTL_DATA_BASE_URL permite apuntar a un servidor local, p.ej. en pruebas de carga)
+DATA_BASE_URL = os.environ.get("RTL_DATA_BASE_URL", "https://github.com/gamerhackleon-afk/RTLRAGA/raw/main")
+ONLINE_CHECK_URL = os.environ.get("RTL_DATA_BASE_URL", "https://github.com")
+URLS_DB = {
+    "SORIANA": f"{DATA_BASE_URL}/SORIANA.xlsx",
+    "WALMART": f"{DATA_BASE_URL}/WALMART.xlsx",
+    "CHEDRAUI": f"{DATA_BASE_URL}/CHEDRAUI.xlsx"
+}
+
+# --- 2. DESCARGA Y CACHÉ DE DATASETS ---
+
+def download_file(url_or_file):
+    if isinstance(url_or_file, str):
+        try:
+            headers = {'User-Agent': 'Mozilla/5.0'}
+            response = requests.get(url_or_file, headers=headers, timeout=10)
+            response.raise_for_status()
+            return BytesIO(response.content)
+        except Exception:
+            return None
+    return url_or_file
+
+# Solo la fuente oficial (URL) actualiza la foto de alertas; un archivo subido no la reemplaza
+ALERT_SOURCES = {"load_sor": "SORIANA", "load_wal": "WALMART", "load_che": "CHEDRAUI"}
+
+def track_alerts(df, retailer):
+    if df is not None and retailer is not None:
+        try: update_alerts(base_frame(df, retailer), retailer)
+        except Exception: pass
+    return df
+
+def get_dataset_cache():
+    return shared_cache(**DATASET_CACHE_CONFIG)
+
+def get_shared_store():
+    return shared_store(ttl=DATASET_TTL)
+
+def dataset_cached(load_func):
+    @functools.wraps(load_func)
+    def wrapper(source):
+        key = f"{load_func.__name__}:{source_key(source)}"
+        retailer = ALERT_SOURCES.get(load_func.__name__) if isinstance(source, str) else None
+        build = lambda: track_alerts(load_func(source), retailer)
+        store = get_shared_store()
+        if store is None or not isinstance(source, str):
+            return get_dataset_cache().get_or_load(key, build)
+        # Multi-proceso: un solo parseo por versión en el host; cada proceso mapea el archivo Arrow
+        name = load_func.__name__
+        cache = get_dataset_cache()
+        version = store.current_version(name)
+        if version is None:
+            # Una versión que no se pudo publicar queda en la caché privada del proceso: se sirve de ahí
+            df = cache.get(key)
+            if df is not None or cache.failed_recently(key):
+                return df
+            version, df = store.refresh(name, build)
+            if version is None:
+                if df is not None: cache.put(key, df)
+                else: cache.mark_failed(key)
+                return df
+        versioned = f"{key}@{version}"
+        def read_version():
+            # Al mapear una versión nueva se sueltan las anteriores para que el archivo borrado no siga mapeado
+            cache.discard(f"{key}@", keep=versioned)
+            return store.read(name, version)
+        return cache.get_or_load(versioned, read_version, shared=True)
+    return wrapper
+
+# --- 3. FUNCIONES DE LECTURA DE EXCEL ---
+
+def optimize_floats(df):
+    for col in df.select_dtypes(include=['float64']).columns:
+        df[col] = df[col].astype('float32')
+    return df
+
+@dataset_cached
+def load_sor(path):
+    try:
+        source = download_file(path)
+        if source is None: return None
+        
+        df = pd.read_excel(source, engine='openpyxl')
+        
+        while df.shape[1] < 31:
+            df[f"COL_AUTO_{df.shape[1]}"] = 0
+            
+        df.rename(columns={
+            df.columns[2]: "CODIGO", df.columns[3]: "DESCRIPCION", df.columns[4]: "CATEGORIA",
+            df.columns[5]: "NO_TIENDA", df.columns[6]: "TIENDA", df.columns[7]: "CIUDAD",
+            df.columns[8]: "ESTADO", df.columns[9]: "FORMATO", 
+            df.columns[30]: "DIAS_INV",  
+            df.columns[28]: "INV_CAJAS", 
+            df.columns[24]: "SO_$",      
+            df.columns[0]: "RESURTIMIENTO"
+        }, inplace=True)
+        
+        df["CODIGO"] = df["CODIGO"].astype(str).str.replace(r'\.0*$', '', regex=True)
+        
+        cols_num = ["DIAS_INV", "INV_CAJAS", "SO_$"]
+        for c in cols_num:
+            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+        
+        cols_4sem = [df.columns[21], df.columns[22], df.columns[23], df.columns[24]]
+        for c in cols_4sem:
+            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+        
+        df['SO_4SEM'] = df[cols_4sem].sum(axis=1) 
+        df['SIN_VTA'] = (df['SO_4SEM'] == 0)
+        df['VTA_PROM'] = df['SO_4SEM'] 
+        for c in ["SO_$", "SO_4SEM", "VTA_PROM"]: df[c] = to_cents(df[c])
+        df["INV_CAJAS"] = compact_quantity(df["INV_CAJAS"])
+        df = attach_sku(df, "SORIANA", "DESCRIPCION")
+        df = add_exception_flags(optimize_floats(df), "SORIANA")
+        return df
+    except Exception as e: 
+        return None
+
+@dataset_cached
+def load_wal(path):
+    try:
+        source = download_file(path)
+        if source is None: return None
+
+        df = pd.read_excel(source, engine='openpyxl')
+        
+        while df.shape[1] < 97:
+            df[f"COL_AUTO_{df.shape[1]}"] = 0
+            
+        df.rename(columns={
+            df.columns[0]: "CODIGO", df.columns[4]: "DESCRIPCION", df.columns[5]: "CATEGORIA",
+            df.columns[7]: "ESTADO", df.columns[15]: "TIENDA", df.columns[16]: "FORMATO",
+            df.columns[18]: "MARCA",
+            df.columns[33]: "DIAS_INV", df.columns[42]: "EXISTENCIA",
+            **{df.columns[73 + i]: c for i, c in enumerate(WAL_4SEM_COLS)}
+        }, inplace=True)
+        df["CODIGO"] = df["CODIGO"].astype(str).str.replace(r'\.0*$', '', regex=True)
+        for c_name in ["DIAS_INV", "EXISTENCIA", *WAL_4SEM_COLS, df.columns[96]]:
+            df[c_name] = pd.to_numeric(df[c_name], errors='coerce').fillna(0)
+        df['PROM_PZS_MENSUAL'] = df[WAL_4SEM_COLS].mean(axis=1)
+        df['SO_$'] = to_cents(df.iloc[:,96])
+        for c_name in ["EXISTENCIA", *WAL_4SEM_COLS]:
+            df[c_name] = compact_quantity(df[c_name])
+        df = attach_sku(df, "WALMART", "DESCRIPCION")
+        df = add_exception_flags(optimize_floats(df), "WALMART")
+        return df
+    except Exception as e: 
+        return None
+
+@dataset_cached
+def load_che(path):
+    try:
+        source = download_file(path)
+        if source is None: return None
+
+        df = pd.read_excel(source, engine='openpyxl')
+        
+        while df.shape[1] < 20:
+            df[f"COL_AUTO_{df.shape[1]}"] = 0
+            
+        col_h = pd.to_numeric(df.iloc[:, 7], errors='coerce')
+        df = df[col_h != 0]
+            
+        df = df.dropna(subset=[df.columns[12]])
+        df = df[pd.to_numeric(df.iloc[:,9], errors='coerce').notna()]
+        
+        df.rename(columns={
+            df.columns[3]: "ESTADO", df.columns[8]: "CATEGORIA", df.columns[9]: "NO_TIENDA",
+            df.columns[10]: "TIENDA", df.columns[12]: "ARTICULO", df.columns[13]: "INV_ULT_SEM", df.columns[14]: "TRANSITO",
+            df.columns[17]: "VTA_PROM_DIARIA", df.columns[18]: "DIAS_INV", df.columns[19]: "SELL_OUT"
+        }, inplace=True)
+
+        for col in ["INV_ULT_SEM", "TRANSITO", "VTA_PROM_DIARIA", "DIAS_INV", "SELL_OUT"]:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        df["SELL_OUT"] = to_cents(df["SELL_OUT"])
+        for col in ["INV_ULT_SEM", "TRANSITO"]: df[col] = compact_quantity(df[col])
+            
+        df = attach_sku(df, "CHEDRAUI", "ARTICULO")
+        df = add_exception_flags(optimize_floats(df), "CHEDRAUI")
+        return df
+    except Exception as e: 
+        return None
+
+@dataset_cached
+def load_fre(file):
+    return pd.read_excel(file, engine='openpyxl')
+
+LOADERS = {"SORIANA": load_sor, "WALMART": load_wal, "CHEDRAUI": load_che}
+
+def load_retailer(retailer):
+    return LOADERS[retailer](URLS_DB[retailer])
@@ -0,0 +1,263 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# --- 1. CONFIGURACIÓN ---
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RETAILER_FILES = ["SORIANA.xlsx", "WALMART.xlsx", "CHEDRAUI.xlsx"]
+
+# Guion de cada sesión: (acción, llave/etiqueta, valor)
+SESSION_SCRIPT = [
+    ("click", "btn_w_neg", None),
+    ("click", "btn_w_neg", None),
+    ("select", "Estado", 0),
+    ("click", "rk_gen", None),
+    ("click", "btn_w_dias", None),
+    ("click", "btn_w_sug", None),
+    ("click", "nav_sor", None),
+    ("click", "btn_sor_rojo", None),
+    ("click", "s_rk_pas", None),
+    ("select", "Categoría", 0),
+    ("click", "nav_che", None),
+    ("click", "btn_che_u10", None),
+    ("click", "c_rk_nut", None),
+    ("click", "btn_che_dias", None),
+    ("click", "nav_con", None),
+]
+
+# Guion equivalente para ?lite=1: la vista ligera no tiene botones de excepción ni de ranking, se navega con radios
+LITE_SESSION_SCRIPT = [
+    ("radio", "lite_exc_WALMART", "SIN VTA 4SEM"),
+    ("radio", "lite_exc_WALMART", "NEGATIVOS"),
+    ("radio", "lite_rank_WALMART", "PASTAS"),
+    ("radio", "lite_rank_WALMART", "NUTRIOLI"),
+    ("radio", "lite_rank_WALMART", "GENERAL"),
+    ("click", "nav_sor", None),
+    ("radio", "lite_rank_SORIANA", "PASTAS"),
+    ("radio", "lite_rank_SORIANA", "OLIVAS"),
+    ("radio", "lite_rank_SORIANA", "GENERAL"),
+    ("click", "nav_che", None),
+    ("radio", "lite_exc_CHEDRAUI", "DIAS INV < 10"),
+    ("radio", "lite_rank_CHEDRAUI", "NUTRIOLI"),
+    ("radio", "lite_exc_CHEDRAUI", "NEGATIVO / 0"),
+    ("radio", "lite_rank_CHEDRAUI", "GENERAL"),
+    ("click", "nav_con", None),
+]
+
+# --- 2. SERVIDOR LOCAL (SUSTITUTO DE GITHUB) ---
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    hits = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+def start_server(data_dir):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=data_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def synth_workbook(name, path, rows, seed=0):
+    # Réplica posicional mínima de los layouts que leen load_sor / load_wal
+    rng = np.random.default_rng(seed)
+    master = pd.read_csv(os.path.join(os.path.dirname(APP_PATH), "sku_master.csv"))
+    retailer = name.split(".")[0]
+    descs = master.loc[master["RETAILER"] == retailer, "DESCRIPCION"].tolist() or ["PRODUCTO"]
+    stores = rng.integers(1, max(rows // 50, 2), rows)
+    if retailer == "SORIANA":
+        df = pd.DataFrame({f"C{i}": rng.integers(0, 50, rows).astype(float) for i in range(31)})
+        df["C0"], df["C2"], df["C3"] = rng.choice([1.0, 0.0], rows), rng.integers(1000, 1100, rows), rng.choice(descs, rows)
+        df["C4"], df["C5"], df["C6"] = rng.choice(["ACEITES", "PASTAS"], rows), stores, [f"SORIANA {s}" for s in stores]
+        df["C7"], df["C8"], df["C9"] = "CIUDAD", rng.choice(["JALISCO", "NUEVO LEON", "CDMX"], rows), rng.choice(["HIPER", "MEGA"], rows)
+        df[["C21", "C22", "C23", "C24"]] = rng.choice([0, 0, 3, 8], (rows, 4))
+        df["C30"] = rng.normal(20, 15, rows).round(1)
+    else:
+        df = pd.DataFrame({f"W{i}": rng.integers(0, 5, rows).astype(float) for i in range(97)})
+        df["W0"], df["W4"], df["W5"] = rng.integers(1, 999, rows), rng.choice(descs, rows), rng.choice(["ACEITES", "PASTAS"], rows)
+        df["W7"], df["W15"], df["W16"] = rng.choice(["JALISCO", "CDMX"], rows), [f"WALMART {s}" for s in stores], rng.choice(["SC", "BOD", "BAE"], rows)
+        df["W18"], df["W33"], df["W42"] = rng.choice(["NUTRIOLI", "OLI", "BORGES"], rows), rng.normal(20, 15, rows).round(1), rng.integers(-5, 40, rows)
+        df["W96"] = (rng.random(rows) * 1000).round(2)
+    df.to_excel(path, index=False)
+
+def prepare_data_dir(source_dir, synth_rows):
+    data_dir = tempfile.mkdtemp(prefix="rtl_loadtest_")
+    for name in RETAILER_FILES:
+        src = os.path.join(source_dir, name)
+        if os.path.exists(src):
+            shutil.copy(src, os.path.join(data_dir, name))
+        elif synth_rows:
+            synth_workbook(name, os.path.join(data_dir, name), synth_rows)
+    return data_dir
+
+# --- 3. MÉTRICAS DE PROCESO Y CACHÉ ---
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def dataset_cache_stats():
+    from dataset_cache import current_cache
+    cache = current_cache()
+    return cache.stats() if cache is not None else None
+
+def cache_bytes():
+    from streamlit.runtime.caching import cache_data_api
+    stats = cache_data_api.get_data_cache_stats_provider().get_stats()
+    if isinstance(stats, dict):
+        stats = [s for family in stats.values() for s in family]
+    return len(stats), sum(s.byte_length for s in stats)
+
+# --- 4. SESIONES ---
+
+def serialize_compilation():
+    # CPython 3.11 puede fallar al compilar el mismo script desde varios hilos a la vez
+    from streamlit.runtime.scriptrunner import script_cache
+    original = script_cache.ScriptCache.get_bytecode
+    lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with lock:
+            return original(self, script_path)
+    script_cache.ScriptCache.get_bytecode = get_bytecode
+
+def run_step(at, action, target, value):
+    if action == "click":
+        at.button(key=target).click()
+    elif action == "select":
+        widget = next((w for w in at.multiselect if w.label == target), None)
+        if widget is None or not widget.options:
+            return None
+        widget.select(widget.options[value])
+    elif action == "radio":
+        at.radio(key=target).set_value(value)
+    t0 = time.perf_counter()
+    at.run()
+    return time.perf_counter() - t0
+
+def run_session(timeout, lite=False):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    if lite:
+        at.query_params["lite"] = "1"
+    latencies, errors, skipped = [], 0, 0
+    t0 = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - t0)
+    for action, target, value in (LITE_SESSION_SCRIPT if lite else SESSION_SCRIPT):
+        try:
+            elapsed = run_step(at, action, target, value)
+        except (KeyError, StopIteration):
+            elapsed = None
+        if elapsed is None:
+            skipped += 1
+        else:
+            latencies.append(elapsed)
+        errors += len(at.exception)
+    return at, latencies, errors, skipped
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    return float(np.percentile(values, q))
+
+def run_level(sessions, timeout, lite=False):
+    import streamlit as st
+    from dataset_cache import current_cache
+    st.cache_data.clear()
+    if current_cache() is not None:
+        current_cache().clear()
+    CountingHandler.hits.clear()
+    gc.collect()
+    rss_before = rss_bytes()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda _: run_session(timeout, lite), range(sessions)))
+    wall = time.perf_counter() - t0
+    gc.collect()
+    rss_after = rss_bytes()
+    latencies = [lat for _, lats, _, _ in results for lat in lats]
+    entries, size = cache_bytes()
+    ds = dataset_cache_stats()
+    downloads = sum(v for k, v in CountingHandler.hits.items() if k.endswith(".xlsx"))
+    datasets = sum(1 for k in CountingHandler.hits if k.endswith(".xlsx"))
+    report = {
+        "sesiones": sessions,
+        "reruns": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+        "wall_s": round(wall, 2),
+        "mem_por_sesion_mb": round((rss_after - rss_before) / sessions / 2**20, 2),
+        "rss_mb": round(rss_after / 2**20, 1),
+        "descargas": downloads,
+        "descargas_por_dataset": round(downloads / datasets, 2) if datasets else 0.0,
+        "cache_entradas": entries,
+        "cache_mb": round(size / 2**20, 2),
+        "datasets_mb": round(ds["used_mb"], 2) if ds else 0.0,
+        "datasets_hits": ds["hits"] if ds else 0,
+        "datasets_expulsiones": ds["evictions"] if ds else 0,
+        "datasets_volcados_fallidos": ds["spill_failures"] if ds else 0,
+        "excepciones": sum(e for _, _, e, _ in results),
+        "pasos_omitidos": sum(k for _, _, _, k in results),
+    }
+    del results
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga headless de Retail Manager con sesiones concurrentes.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--data-dir", default=os.path.dirname(APP_PATH), help="Carpeta con SORIANA/WALMART/CHEDRAUI.xlsx")
+    parser.add_argument("--synth-rows", type=int, default=5000, help="Filas sintéticas para archivos faltantes (0 = no generar)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--json", help="Ruta para guardar el reporte en JSON")
+    parser.add_argument("--lite", action="store_true", help="Sesiones en vista ligera (?lite=1)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    serialize_compilation()
+
+    data_dir = prepare_data_dir(args.data_dir, args.synth_rows)
+    server, base_url = start_server(data_dir)
+    os.environ["RTL_DATA_BASE_URL"] = base_url
+    os.environ.setdefault("RTL_ALERTS_DIR", os.path.join(data_dir, ".alertas"))
+
+    reports = []
+    try:
+        for n in args.sessions:
+            rep = run_level(n, args.timeout, args.lite)
+            reports.append(rep)
+            print(" | ".join(f"{k}={v}" for k, v in rep.items()), flush=True)
+    finally:
+        server.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print()
+    print(pd.DataFrame(reports).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# --- 1. CONFIGURACIÓN ---
+DEFAULT_TARGET_DAYS = 21
+MAX_TARGET_DAYS = 120
+
+# Inventario, tránsito y venta diaria por retailer. "rate" = (columna, días que cubre la columna).
+# Soriana no trae venta en unidades (SO_4SEM es en $): la venta diaria se deriva de INV_CAJAS / DIAS_INV,
+# así que sin existencia no hay venta estimada ni sugerido, pero el renglón sí cuenta como agotado.
+# Walmart: PZS_SEM_1..4 (columnas 73-76) son venta semanal en piezas, PROM_PZS_MENSUAL es su promedio.
+REORDER_SOURCES = {
+    "SORIANA": {"inv": "INV_CAJAS", "transit": None, "rate": None, "days": "DIAS_INV", "unit": "CAJAS",
+                "cols": ["NO_TIENDA", "TIENDA", "ESTADO", "CODIGO", "DESCRIPCION"]},
+    "WALMART": {"inv": "EXISTENCIA", "transit": None, "rate": ("PROM_PZS_MENSUAL", 7), "unit": "PZS",
+                "cols": ["TIENDA", "ESTADO", "CODIGO", "DESCRIPCION"]},
+    "CHEDRAUI": {"inv": "INV_ULT_SEM", "transit": "TRANSITO", "rate": ("VTA_PROM_DIARIA", 1), "unit": "PZS",
+                 "cols": ["NO_TIENDA", "TIENDA", "ESTADO", "ARTICULO"]},
+}
+PROJECTION_COLS = ["INVENTARIO", "TRANSITO", "VTA_DIARIA", "DIAS_COBERTURA", "FECHA_AGOTAMIENTO", "SUGERIDO"]
+
+# --- 2. PROYECCIÓN VECTORIZADA ---
+
+def _values(df, col):
+    if col is None or col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+def daily_rate(df, retailer):
+    src = REORDER_SOURCES[retailer]
+    if src["rate"] is None:
+        inv, days = _values(df, src["inv"]), _values(df, src["days"])
+        rate = np.divide(inv, days, out=np.zeros(len(df)), where=(inv > 0) & (days > 0))
+    else:
+        col, span = src["rate"]
+        rate = _values(df, col) / span
+    return np.clip(rate, 0, None)
+
+def project_inventory(df, retailer, target_days=DEFAULT_TARGET_DAYS, as_of=None):
+    src = REORDER_SOURCES[retailer]
+    as_of = np.datetime64(pd.Timestamp(as_of or "today").normalize().date(), "D")
+    inv, transit = _values(df, src["inv"]), _values(df, src["transit"])
+    rate = daily_rate(df, retailer)
+    # Inventario negativo se toma como tienda sin existencia; el tránsito ya cuenta como cobertura
+    position = np.clip(inv, 0, None) + np.clip(transit, 0, None)
+    cover = np.divide(position, rate, out=np.full(len(df), np.inf), where=rate > 0)
+    # Sin existencia ni tránsito ya está agotado, aunque no haya venta con qué proyectar
+    cover[position <= 0] = 0
+    stockout = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[D]")
+    finite = np.isfinite(cover)
+    stockout[finite] = as_of + np.floor(cover[finite]).astype("timedelta64[D]")
+    suggested = np.ceil(np.clip(target_days * rate - position, 0, None) - 1e-9)
+
+    proj = df[[c for c in src["cols"] if c in df.columns]].reset_index(drop=True)
+    for c in proj.columns[proj.dtypes == object]:
+        proj[c] = proj[c].astype(str)
+    proj["INVENTARIO"] = inv.astype("float32")
+    proj["TRANSITO"] = transit.astype("float32")
+    proj["VTA_DIARIA"] = rate.astype("float32")
+    proj["DIAS_COBERTURA"] = cover.astype("float32")
+    proj["FECHA_AGOTAMIENTO"] = pd.to_datetime(stockout)
+    proj["SUGERIDO"] = np.clip(suggested, 0, None).astype("int64")
+    return proj
+
+def reorder_list(proj, only_suggested=True):
+    if only_suggested:
+        # Los agotados se muestran aunque no tengan sugerido (sin venta registrada no hay cantidad que calcular)
+        proj = proj[(proj["SUGERIDO"].to_numpy() > 0) | (proj["DIAS_COBERTURA"].to_numpy() <= 0)]
+    # Primero lo que se agota antes; a igual cobertura, lo que pide más unidades
+    order = np.lexsort((-proj["SUGERIDO"].to_numpy(), proj["DIAS_COBERTURA"].to_numpy()))
+    return proj.iloc[order].reset_index(drop=True)
+
+def reorder_summary(proj, target_days=DEFAULT_TARGET_DAYS):
+    sug = proj["SUGERIDO"].to_numpy()
+    cover = proj["DIAS_COBERTURA"].to_numpy()
+    return {
+        "unidades": int(sug.sum()),
+        "renglones": int((sug > 0).sum()),
+        "tiendas": int(proj.loc[sug > 0, "TIENDA"].nunique()) if "TIENDA" in proj.columns else 0,
+        "agotados": int((cover <= 0).sum()),
+        "en_riesgo": int(((cover > 0) & (cover < target_days)).sum()),
+    }
+
+def export_csv(proj):
+    out = proj.copy()
+    out["FECHA_AGOTAMIENTO"] = out["FECHA_AGOTAMIENTO"].dt.strftime("%Y-%m-%d")
+    out["DIAS_COBERTURA"] = out["DIAS_COBERTURA"].replace(np.inf, np.nan).round(1)
+    out["VTA_DIARIA"] = out["VTA_DIARIA"].round(3)
+    return out.to_csv(index=False).encode("utf-8-sig")
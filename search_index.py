@@ -0,0 +1,80 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+from ingest import normalize_text
+
+# --- 1. CONFIGURACIÓN ---
+NGRAM = 3
+MIN_NGRAM_SCORE = 0.5
+
+def ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+# --- 2. ÍNDICE DE BÚSQUEDA ---
+
+class SearchIndex:
+    # Índice sobre texto normalizado (mayúsculas, sin acentos ni &NBSP;):
+    # - prefijos por palabra con búsqueda binaria sobre la lista ordenada de palabras
+    # - n-gramas del texto compacto (sin espacios) para variantes como "MI SAZON" / "MISAZON" y errores de captura
+
+    def __init__(self, values, n=NGRAM):
+        self.n = n
+        self.values = [str(v) for v in values]
+        self.norm = [normalize_text(v) for v in self.values]
+        self.keys = [t.replace(" ", "") for t in self.norm]
+        self.lengths = np.array([len(k) for k in self.keys], dtype=np.int32)
+
+        words = sorted({(w, i) for i, t in enumerate(self.norm) for w in t.split()})
+        self.words = [w for w, _ in words]
+        self.word_ids = np.array([i for _, i in words], dtype=np.int32)
+
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for gram in ngrams(key, n):
+                postings[gram].append(i)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.values)
+
+    def prefix_ids(self, token):
+        lo = bisect_left(self.words, token)
+        hi = bisect_left(self.words, token + "\uffff")
+        return np.unique(self.word_ids[lo:hi])
+
+    def scores(self, query):
+        q_norm = normalize_text(query)
+        q_key = q_norm.replace(" ", "")
+        scores = np.zeros(len(self.values))
+        if not q_key:
+            return scores
+
+        # Cada palabra del query que es prefijo de alguna palabra de la opción suma 1 / palabras
+        tokens = q_norm.split()
+        for tok in tokens:
+            scores[self.prefix_ids(tok)] += 1.0 / len(tokens)
+
+        # Fracción de n-gramas del query presentes; debajo del umbral no cuenta
+        grams = ngrams(q_key, self.n)
+        if grams:
+            hits = [self.postings[g] for g in grams if g in self.postings]
+            if hits:
+                overlap = np.bincount(np.concatenate(hits), minlength=len(self.values)) / len(grams)
+                scores += np.where(overlap >= MIN_NGRAM_SCORE, overlap, 0)
+
+        # Coincidencia literal del texto compacto (solo sobre candidatos)
+        for i in np.flatnonzero(scores):
+            if q_key in self.keys[i]:
+                scores[i] += 1.0 + (0.5 if self.keys[i].startswith(q_key) else 0) + (1.0 if self.keys[i] == q_key else 0)
+        return scores
+
+    def search(self, query, limit=20):
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        # Mayor puntaje primero; a igual puntaje, el texto más corto (más específico)
+        order = np.lexsort((self.lengths[candidates], -scores[candidates]))[:limit]
+        return [self.values[i] for i in candidates[order]]
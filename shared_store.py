@@ -0,0 +1,158 @@
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+from ingest import arrow_safe
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candados entre procesos, el almacén se desactiva
+    fcntl = None
+
+# --- 1. CONFIGURACIÓN ---
+# Vacío = desactivado. Con varios procesos de Streamlit en el mismo host, apuntar todos a la misma carpeta.
+STORE_DIR = os.environ.get("RTL_SHARED_STORE", "")
+KEEP_VERSIONS = 2
+# Si la fuente falla al renovar, se sigue sirviendo la última versión y no se reintenta antes de esto
+RETRY_AFTER = 300
+
+# --- 2. CONVERSIÓN A ARROW ---
+
+def store_frame(df):
+    # Todas las columnas object se guardan como diccionario: to_pandas copia cada cadena a la memoria
+    # del proceso, pero de un diccionario solo copia las categorías y los códigos quedan sobre el mapa
+    df = arrow_safe(df)
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype("category")
+    return df
+
+def frame_version(df):
+    return format(int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFFFFFF, "016x")
+
+# --- 3. ALMACÉN COMPARTIDO ---
+
+class SharedStore:
+    # Un archivo Arrow IPC por versión de dataset + manifiesto JSON con la versión vigente.
+    # El primer proceso que encuentra la versión vencida toma el candado, parsea y escribe;
+    # los demás esperan el candado y mapean el archivo en solo lectura.
+
+    def __init__(self, root, ttl=3600):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name, suffix):
+        return os.path.join(self.root, f"{name}.{suffix}")
+
+    @contextmanager
+    def _lock(self, name):
+        with open(self._path(name, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def manifest(self, name):
+        try:
+            with open(self._path(name, "json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _fresh(self, manifest):
+        if manifest is None or not os.path.exists(manifest["path"]):
+            return False
+        now = time.time()
+        return self.ttl is None or now - manifest["updated"] <= self.ttl or now < manifest.get("retry_at", 0)
+
+    def current_version(self, name):
+        # Aviso de versión: cada acceso lee el manifiesto; si otro proceso publicó una versión nueva se toma esa
+        manifest = self.manifest(name)
+        return manifest["version"] if self._fresh(manifest) else None
+
+    def refresh(self, name, build):
+        # Devuelve (versión, None) si quedó publicada, o (None, df) si el dataset no se pudo compartir
+        with self._lock(name):
+            manifest = self.manifest(name)
+            if self._fresh(manifest):
+                return manifest["version"], None
+            df = build()
+            if df is None:
+                # Sin fuente disponible: se sigue sirviendo la última versión publicada y se aplaza el reintento
+                # para que los demás accesos no vuelvan a tomar el candado ni a descargar
+                if manifest is not None and os.path.exists(manifest["path"]):
+                    self._write_manifest(name, {**manifest, "retry_at": time.time() + RETRY_AFTER})
+                    return manifest["version"], None
+                return None, None
+            try:
+                version = self._publish(name, df)
+            except (pa.ArrowException, OSError, ValueError, TypeError):
+                return None, df
+            return version, None
+
+    def read(self, name, version):
+        source = pa.memory_map(self._path(f"{name}-{version}", "arrow"), "r")
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks evita consolidar columnas: las numéricas sin nulos y los códigos de las categóricas
+        # quedan sobre el mapa compartido
+        return table.to_pandas(split_blocks=True)
+
+    def status(self):
+        rows = []
+        for path in sorted(glob.glob(os.path.join(self.root, "*.json"))):
+            name = os.path.basename(path)[:-5]
+            manifest = self.manifest(name)
+            if manifest is None:
+                continue
+            rows.append({"DATASET": name, "VERSION": manifest["version"][:8], "FILAS": manifest["rows"],
+                         "MB": manifest["bytes"] / 2**20, "PUBLICADO": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest["created"])),
+                         "VIGENTE": self._fresh(manifest)})
+        return pd.DataFrame(rows, columns=["DATASET", "VERSION", "FILAS", "MB", "PUBLICADO", "VIGENTE"])
+
+    def _publish(self, name, df):
+        version = frame_version(df)
+        path = self._path(f"{name}-{version}", "arrow")
+        previous = self.manifest(name)
+        created = previous["created"] if previous and previous["version"] == version and os.path.exists(path) else time.time()
+        if not os.path.exists(path):
+            table = pa.Table.from_pandas(store_frame(df), preserve_index=False)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        self._write_manifest(name, {"version": version, "path": path, "rows": len(df), "bytes": os.path.getsize(path),
+                                    "created": created, "updated": time.time()})
+        self._prune(name, keep=path)
+        return version
+
+    def _write_manifest(self, name, manifest):
+        tmp = f"{self._path(name, 'json')}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._path(name, "json"))
+
+    def _prune(self, name, keep):
+        # Borrar un archivo mapeado por otro proceso es seguro en POSIX: el mapa sigue vivo hasta que lo suelta
+        files = sorted(glob.glob(self._path(f"{name}-*", "arrow")), key=os.path.getmtime, reverse=True)
+        for path in [f for f in files if f != keep][KEEP_VERSIONS - 1:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# --- 4. INSTANCIA POR PROCESO ---
+_STORE = None
+
+def shared_store(root=STORE_DIR, ttl=3600):
+    global _STORE
+    if not root or fcntl is None:
+        return None
+    if _STORE is None or _STORE.root != root:
+        _STORE = SharedStore(root, ttl)
+    return _STORE